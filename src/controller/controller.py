@@ -1,24 +1,25 @@
 import math
 import random
-import logging
-
-from operator import itemgetter
+import collections
 
 from host.host import *
+from controller.load_index import LoadIndex
+from util import trace
 
 
 class Controller(object):
 
-    workers = []
-
     def __init__(self, env, num_workers, num_cores, capacity, latency,
                  flow_config, histograms, opts):
 
+        self.workers = []
         self.latency = latency
         self.env = env
         self.queue = FIFORequestQueue(env, -1, 0, flow_config)
         self.num_cores = num_cores
         self.num_workers = num_workers
+        # Random choices use the global generator unless given their own
+        self.rng = random
 
         for i in range(num_workers):
             if 'core_list' in flow_config[0]:
@@ -30,6 +31,28 @@ class Controller(object):
                                              histograms, 0, flow_config, opts)
             self.workers.append(new_worker)
 
+        if opts.steal_work:
+            self.steal_coordinator = StealCoordinator(env, self.workers,
+                                                      latency, opts)
+
+    def set_rng(self, rng):
+        self.rng = rng
+
+    def dispatch(self, request, worker_idx):
+        # Without communication latency the request is handed to the worker
+        # right away, otherwise a single callback fires once it arrives
+        if self.latency == 0:
+            self.assign_to_worker(request, worker_idx)
+            return
+        self.env.call_later(self.latency,
+                            lambda: self.assign_to_worker(request, worker_idx))
+
+    def assign_to_worker(self, request, worker_idx):
+        if trace.ENABLED:
+            trace.record(trace.DISPATCH, self.env.now, request, worker_idx)
+        request.dispatch_time = self.env.now
+        self.workers[worker_idx].receive_request(request)
+
 
 class LateBindingController(Controller):
 
@@ -40,52 +63,37 @@ class LateBindingController(Controller):
                                                     latency, flow_config,
                                                     histogram, opts)
         if 'core_list' in flow_config[0]:
-            self.worker_capacity = flow_config[0]['core_list'][:]
+            worker_capacity = flow_config[0]['core_list'][:]
         else:
-            self.worker_capacity = [num_cores * opts.queue_per_core] * num_workers
+            worker_capacity = [num_cores * opts.queue_per_core] * num_workers
+        self.worker_loads = LoadIndex(num_workers, limits=worker_capacity)
 
     def receive_request(self, request):
-        logging.info('Controller: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
         # Find if there is a worker with available capacity
-        worker_idx = -1
-        for i in range(len(self.worker_capacity)):
-            if self.worker_capacity[i] > 0:
-                self.worker_capacity[i] -= 1
-                worker_idx = i
-                break
+        worker_idx = self.worker_loads.first_fit()
 
         # If not, enqueue and wait until one become available
         if worker_idx == -1:
             self.queue.enqueue(request)
             #print("Queue Size: {}".format(len(self.queue)))
-            logging.info('LateBindingController: Enqueuing request %d from'
-                         ' flow %d at %f' % (request.idx, request.flow_id,
-                                             self.env.now))
+            if trace.ENABLED:
+                trace.record(trace.ENQUEUE, self.env.now, request)
             return
 
         # If yes, take the overhead into account and assign request for
         # execution
-        self.env.process(self.assign_to_worker(request, worker_idx))
-
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('LateBindingController: Assign request %d from flow'
-                     ' %d at %f to worker %d' % (request.idx,
-                                                 request.flow_id,
-                                                 self.env.now, worker_idx))
-        self.workers[worker_idx].receive_request(request)
+        self.worker_loads.add(worker_idx, 1)
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('LateBindingController: Received completion from request'
-                     ' %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
-        self.worker_capacity[worker_idx] += 1
+        self.worker_loads.add(worker_idx, -1)
         queued_request = self.queue.dequeue()
         if queued_request:
-            self.worker_capacity[worker_idx] -= 1
-            self.env.process(self.assign_to_worker(queued_request, worker_idx))
+            self.worker_loads.add(worker_idx, 1)
+            self.dispatch(queued_request, worker_idx)
 
 
 class HeterogeneousLeastLoadedController(Controller):
@@ -97,54 +105,37 @@ class HeterogeneousLeastLoadedController(Controller):
                              latency, flow_config, histogram, opts)
         self.core_list = flow_config[0]['core_list']
         self.capacity = capacity
-        self.worker_loads = [0] * num_workers
+        self.worker_loads = LoadIndex(num_workers, limits=self.core_list)
 
     def receive_request(self, request):
-        logging.info('Controller: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
-        # Find least-loaded worker
-        worker_idx = -1
-        for i in range(len(self.core_list)):
-            if self.worker_loads[i] < self.core_list[i]:
-                worker_idx = i
-                break
+        # Find the first worker with an idle core, otherwise the
+        # least-loaded one
+        worker_idx = self.worker_loads.first_fit()
 
         if worker_idx == -1:
-            worker_idx = self.worker_loads.index(min(self.worker_loads))
+            worker_idx = self.worker_loads.least_loaded()
 
         # If we reached capacity, wait until a worker becomes available
         if worker_idx == -1:
             self.queue.enqueue(request)
-            logging.info('HeterogeneousLeastLoadedController: Enqueuing'
-                         'request %d from flow %d at %f' % (request.idx,
-                                                            request.flow_id,
-                                                            self.env.now))
+            if trace.ENABLED:
+                trace.record(trace.ENQUEUE, self.env.now, request)
             return
 
         # Take the overhead into account and assign request for
         # execution
-        self.worker_loads[worker_idx] += 1
-        self.env.process(self.assign_to_worker(request, worker_idx))
-
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('HeterogeneousLeastLoadedController: Assign request %d'
-                     ' from flow %d at %f to worker %d' % (request.idx,
-                                                           request.flow_id,
-                                                           self.env.now,
-                                                           worker_idx))
-        self.workers[worker_idx].receive_request(request)
+        self.worker_loads.add(worker_idx, 1)
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('HeterogeneousLeastLoadedController: Received completion'
-                     ' from request %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
-        self.worker_loads[worker_idx] -= 1
+        self.worker_loads.add(worker_idx, -1)
         queued_request = self.queue.dequeue()
         if queued_request:
-            self.worker_loads[worker_idx] += 1
-            self.env.process(self.assign_to_worker(queued_request, worker_idx))
+            self.worker_loads.add(worker_idx, 1)
+            self.dispatch(queued_request, worker_idx)
 
 
 class LeastLoadedController(Controller):
@@ -156,47 +147,35 @@ class LeastLoadedController(Controller):
                                                     latency, flow_config,
                                                     histogram, opts)
         self.capacity = capacity
-        self.worker_loads = [0] * num_workers
+        self.worker_loads = LoadIndex(num_workers)
 
     def receive_request(self, request):
-        logging.info('Controller: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
         # Find least-loaded worker
-        worker_idx = self.worker_loads.index(min(self.worker_loads))
+        worker_idx = self.worker_loads.least_loaded()
         if self.worker_loads[worker_idx] == self.capacity:
             worker_idx = -1
 
         # If we reached capacity, wait until a worker becomes available
         if worker_idx == -1:
             self.queue.enqueue(request)
-            logging.info('LeastLoadedController: Enqueuing request %d from'
-                         ' flow %d at %f' % (request.idx, request.flow_id,
-                                             self.env.now))
+            if trace.ENABLED:
+                trace.record(trace.ENQUEUE, self.env.now, request)
             return
 
         # Take the overhead into account and assign request for
         # execution
-        self.worker_loads[worker_idx] += 1
-        self.env.process(self.assign_to_worker(request, worker_idx))
-
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('LeastLoadedController: Assign request %d from flow'
-                     ' %d at %f to worker %d' % (request.idx,
-                                                 request.flow_id,
-                                                 self.env.now, worker_idx))
-        self.workers[worker_idx].receive_request(request)
+        self.worker_loads.add(worker_idx, 1)
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('LeastLoadedController: Received completion from request'
-                     ' %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
-        self.worker_loads[worker_idx] -= 1
+        self.worker_loads.add(worker_idx, -1)
         queued_request = self.queue.dequeue()
         if queued_request:
-            self.worker_loads[worker_idx] += 1
-            self.env.process(self.assign_to_worker(queued_request, worker_idx))
+            self.worker_loads.add(worker_idx, 1)
+            self.dispatch(queued_request, worker_idx)
 
 
 class LeastLoadedSRPTController(Controller):
@@ -208,7 +187,7 @@ class LeastLoadedSRPTController(Controller):
                                                         latency, flow_config,
                                                         histogram, opts)
         self.capacity = capacity
-        self.worker_loads = [0] * num_workers
+        self.worker_loads = LoadIndex(num_workers)
         self.workers = []
         for i in range(num_workers):
             if 'core_list' in flow_config[0]:
@@ -221,44 +200,32 @@ class LeastLoadedSRPTController(Controller):
             self.workers.append(new_worker)
 
     def receive_request(self, request):
-        logging.info('Controller: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
         # Find least-loaded worker
-        worker_idx = self.worker_loads.index(min(self.worker_loads))
+        worker_idx = self.worker_loads.least_loaded()
         if self.worker_loads[worker_idx] == self.capacity:
             worker_idx = -1
 
         # If we reached capacity, wait until a worker becomes available
         if worker_idx == -1:
             self.queue.enqueue(request)
-            logging.info('LeastLoadedSRPTController: Enqueuing request %d from'
-                         ' flow %d at %f' % (request.idx, request.flow_id,
-                                             self.env.now))
+            if trace.ENABLED:
+                trace.record(trace.ENQUEUE, self.env.now, request)
             return
 
         # Take the overhead into account and assign request for
         # execution
-        self.worker_loads[worker_idx] += 1
-        self.env.process(self.assign_to_worker(request, worker_idx))
-
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('LeastLoadedSRPTController: Assign request %d from flow'
-                     ' %d at %f to worker %d' % (request.idx,
-                                                 request.flow_id,
-                                                 self.env.now, worker_idx))
-        self.workers[worker_idx].receive_request(request)
+        self.worker_loads.add(worker_idx, 1)
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('LeastLoadedSRPTController: Received completion from request'
-                     ' %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
-        self.worker_loads[worker_idx] -= 1
+        self.worker_loads.add(worker_idx, -1)
         queued_request = self.queue.dequeue()
         if queued_request:
-            self.worker_loads[worker_idx] += 1
-            self.env.process(self.assign_to_worker(queued_request, worker_idx))
+            self.worker_loads.add(worker_idx, 1)
+            self.dispatch(queued_request, worker_idx)
 
 class ProportionalLeastLoadedController(Controller):
 
@@ -269,57 +236,39 @@ class ProportionalLeastLoadedController(Controller):
                              latency, flow_config, histogram, opts)
         self.core_list = flow_config[0]['core_list']
         self.capacity = capacity
-        self.worker_loads = [0] * num_workers
+        # Rank workers by their load per core once they get the request
+        self.worker_loads = LoadIndex(num_workers, limits=self.core_list,
+                                      weights=self.core_list, offset=1)
 
     def receive_request(self, request):
-        logging.info('Controller: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
-        # Find least-loaded worker
-        worker_idx = -1
-        for i in range(len(self.core_list)):
-            if self.worker_loads[i] < self.core_list[i]:
-                worker_idx = i
-                break
+        # Find the first worker with an idle core, otherwise the one with
+        # the least load per core
+        worker_idx = self.worker_loads.first_fit()
 
         if worker_idx == -1:
-            new_loads = map(lambda x: x + 1, self.worker_loads)
-            prop_loads = [1.0 * a / b for a, b in zip(new_loads,
-                                                      self.core_list)]
-            worker_idx = min(enumerate(prop_loads), key=itemgetter(1))[0]
+            worker_idx = self.worker_loads.least_loaded()
 
         # If we reached capacity, wait until a worker becomes available
         if worker_idx == -1:
             self.queue.enqueue(request)
-            logging.info('ProportionalLeastLoadedController: Enqueuing request'
-                         ' %d from flow %d at %f' % (request.idx,
-                                                     request.flow_id,
-                                                     self.env.now))
+            if trace.ENABLED:
+                trace.record(trace.ENQUEUE, self.env.now, request)
             return
 
         # Take the overhead into account and assign request for
         # execution
-        self.worker_loads[worker_idx] += 1
-        self.env.process(self.assign_to_worker(request, worker_idx))
-
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('ProportionalLeastLoadedController: Assign request %d'
-                     ' from flow %d at %f to worker %d' % (request.idx,
-                                                           request.flow_id,
-                                                           self.env.now,
-                                                           worker_idx))
-        self.workers[worker_idx].receive_request(request)
+        self.worker_loads.add(worker_idx, 1)
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('ProportionalLeastLoadedController: Received completion'
-                     ' from request  %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
-        self.worker_loads[worker_idx] -= 1
+        self.worker_loads.add(worker_idx, -1)
         queued_request = self.queue.dequeue()
         if queued_request:
-            self.worker_loads[worker_idx] += 1
-            self.env.process(self.assign_to_worker(queued_request, worker_idx))
+            self.worker_loads.add(worker_idx, 1)
+            self.dispatch(queued_request, worker_idx)
 
 
 class LPSController(Controller):
@@ -331,56 +280,37 @@ class LPSController(Controller):
                                             histogram, opts)
         self.capacity = max(num_cores, int(math.floor(1 / (1 -
             flow_config[0]['load'])) + 1))
-        self.loads = [0] * num_workers
+        self.loads = LoadIndex(num_workers,
+                               limits=[num_cores] * num_workers)
 
     def receive_request(self, request):
-        logging.info('Controller: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
         # Find if there is a worker with available capacity
-        worker_idx = -1
-        for i in range(len(self.loads)):
-            if self.loads[i] < self.num_cores:
-                self.loads[i] += 1
-                worker_idx = i
-                break
+        worker_idx = self.loads.first_fit()
 
-        if worker_idx == -1 and min(self.loads) < self.capacity:
-            worker_idx = 0
-            for i in range(len(self.loads)):
-                if self.loads[i] < self.loads[worker_idx]:
-                    worker_idx = i
-            self.loads[worker_idx] += 1
+        if worker_idx == -1 and self.loads.min_load() < self.capacity:
+            worker_idx = self.loads.least_loaded()
 
         # If not, enqueue and wait until one become available
         if worker_idx == -1:
             self.queue.enqueue(request)
-            logging.info('LPSController: Enqueuing request %d from'
-                         ' flow %d at %f' % (request.idx, request.flow_id,
-                                             self.env.now))
+            if trace.ENABLED:
+                trace.record(trace.ENQUEUE, self.env.now, request)
             return
 
         # If yes, take the overhead into account and assign request for
         # execution
-        self.env.process(self.assign_to_worker(request, worker_idx))
-
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('LPSController: Assign request %d from flow'
-                     ' %d at %f to worker %d' % (request.idx,
-                                                 request.flow_id,
-                                                 self.env.now, worker_idx))
-        self.workers[worker_idx].receive_request(request)
+        self.loads.add(worker_idx, 1)
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('LPSController: Received completion from request'
-                     ' %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
-        self.loads[worker_idx] -= 1
+        self.loads.add(worker_idx, -1)
         queued_request = self.queue.dequeue()
         if queued_request:
-            self.loads[worker_idx] += 1
-            self.env.process(self.assign_to_worker(queued_request, worker_idx))
+            self.loads.add(worker_idx, 1)
+            self.dispatch(queued_request, worker_idx)
 
 
 class RandomController(Controller):
@@ -392,28 +322,107 @@ class RandomController(Controller):
                                                histogram, opts)
 
     def receive_request(self, request):
-        logging.info('Controller: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
         # Choose a random worker.
-        worker_idx = random.randint(0, self.num_workers - 1)
+        worker_idx = self.rng.randint(0, self.num_workers - 1)
 
         # Take the overhead into account and assign request for
         # execution
-        self.env.process(self.assign_to_worker(request, worker_idx))
+        self.dispatch(request, worker_idx)
 
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('RandomController: Assign request %d from flow'
-                     ' %d at %f to worker %d' % (request.idx,
-                                                 request.flow_id,
-                                                 self.env.now, worker_idx))
-        self.workers[worker_idx].receive_request(request)
+    def receive_completion(self, request, worker_idx):
+        pass
+
+
+class PowerOfDController(Controller):
+
+    def __init__(self, env, num_workers, num_cores, capacity, latency,
+                 flow_config, histogram, opts):
+        super(PowerOfDController, self).__init__(env, num_workers, num_cores,
+                                                 capacity, latency,
+                                                 flow_config, histogram, opts)
+        self.capacity = capacity
+        self.d = min(opts.power_of_d, num_workers)
+        self.worker_loads = [0] * num_workers
+
+    def receive_request(self, request):
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
+
+        # Sample d distinct workers and pick the least-loaded one
+        worker_idx = -1
+        for i in self.rng.sample(range(self.num_workers), self.d):
+            if (worker_idx == -1 or
+                    self.worker_loads[i] < self.worker_loads[worker_idx]):
+                worker_idx = i
+        if self.worker_loads[worker_idx] == self.capacity:
+            worker_idx = -1
+
+        # If all sampled workers are full, wait until a worker becomes
+        # available
+        if worker_idx == -1:
+            self.queue.enqueue(request)
+            if trace.ENABLED:
+                trace.record(trace.ENQUEUE, self.env.now, request)
+            return
+
+        # Take the overhead into account and assign request for
+        # execution
+        self.worker_loads[worker_idx] += 1
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('RandomController: Received completion from request'
-                     ' %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
+        self.worker_loads[worker_idx] -= 1
+        queued_request = self.queue.dequeue()
+        if queued_request:
+            self.worker_loads[worker_idx] += 1
+            self.dispatch(queued_request, worker_idx)
+
+
+class JoinIdleQueueController(Controller):
+
+    def __init__(self, env, num_workers, num_cores, capacity, latency,
+                 flow_config, histogram, opts):
+        super(JoinIdleQueueController, self).__init__(env, num_workers,
+                                                      num_cores, capacity,
+                                                      latency, flow_config,
+                                                      histogram, opts)
+        if 'core_list' in flow_config[0]:
+            self.worker_cores = flow_config[0]['core_list'][:]
+        else:
+            self.worker_cores = [num_cores] * num_workers
+        self.worker_loads = [0] * num_workers
+
+        # Idle queue holding one entry per idle core, filled round-robin so
+        # that requests spread across workers first
+        self.idle_queue = collections.deque()
+        for i in range(max(self.worker_cores)):
+            for worker_idx in range(num_workers):
+                if i < self.worker_cores[worker_idx]:
+                    self.idle_queue.append(worker_idx)
+
+    def receive_request(self, request):
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
+
+        # Take an idle worker if one reported in, otherwise a random one
+        if self.idle_queue:
+            worker_idx = self.idle_queue.popleft()
+        else:
+            worker_idx = self.rng.randint(0, self.num_workers - 1)
+
+        # Take the overhead into account and assign request for
+        # execution
+        self.worker_loads[worker_idx] += 1
+        self.dispatch(request, worker_idx)
+
+    def receive_completion(self, request, worker_idx):
+        # The worker reports back once one of its cores frees up
+        self.worker_loads[worker_idx] -= 1
+        if self.worker_loads[worker_idx] < self.worker_cores[worker_idx]:
+            self.idle_queue.append(worker_idx)
 
 
 class LocalityController(Controller):
@@ -427,35 +436,24 @@ class LocalityController(Controller):
         self.worker_capacity = [capacity] * num_workers
 
     def receive_request(self, request):
-        logging.info('LocalityController: Received request %d from flow %d at %f' %
-                     (request.idx, request.flow_id, self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.ARRIVE, self.env.now, request)
 
         # Find if there is a worker with available capacity
         worker_idx = -1
         worker_idx = request.idx % len(self.worker_capacity)
         if self.worker_capacity[worker_idx] < 1:
-            worker_idx = random.randint(0, len(self.worker_capacity) - 1)
+            worker_idx = self.rng.randint(0, len(self.worker_capacity) - 1)
 
         self.worker_capacity[worker_idx] -= 1
 
         # If yes, take the overhead into account and assign request for
         # execution
-        self.env.process(self.assign_to_worker(request, worker_idx))
-
-    def assign_to_worker(self, request, worker_idx):
-        yield self.env.timeout(self.latency)
-        logging.info('LocalityController: Assign request %d from flow'
-                     ' %d at %f to worker %d' % (request.idx,
-                                                 request.flow_id,
-                                                 self.env.now, worker_idx))
-        self.workers[worker_idx].receive_request(request)
+        self.dispatch(request, worker_idx)
 
     def receive_completion(self, request, worker_idx):
-        logging.info('LocalityController: Received completion from request'
-                     ' %d from flow %d at %f from worker %d' %
-                     (request.idx, request.flow_id, self.env.now, worker_idx))
         self.worker_capacity[worker_idx] += 1
         queued_request = self.queue.dequeue()
         if queued_request:
             self.worker_capacity[worker_idx] -= 1
-            self.env.process(self.assign_to_worker(queued_request, worker_idx))
+            self.dispatch(queued_request, worker_idx)
@@ -0,0 +1,84 @@
+INF = float('inf')
+
+
+class LoadIndex(object):
+    # Tracks the number of outstanding requests on each worker and answers
+    # the controllers' worker selection queries in O(log W). Loads are kept
+    # in a segment tree whose nodes hold the minimum key of their subtree;
+    # queries descend from the root and break ties towards the lowest worker
+    # index, like a linear scan would.
+    #
+    # least_loaded() minimizes (load + offset) / weight, where weights
+    # default to 1. first_fit() returns the lowest worker whose load is
+    # below its limit, and needs limits to be given.
+
+    def __init__(self, num_workers, limits=None, weights=None, offset=0):
+        self.num_workers = num_workers
+        self.loads = [0] * num_workers
+        self.limits = limits
+        self.weights = weights
+        self.offset = offset
+
+        self.size = 1
+        while self.size < num_workers:
+            self.size *= 2
+        self.min_tree = [INF] * (2 * self.size)
+        self.fit_tree = [INF] * (2 * self.size) if limits else None
+        for i in range(num_workers):
+            self.min_tree[self.size + i] = self.min_key(i)
+            if limits:
+                self.fit_tree[self.size + i] = -limits[i]
+        for p in range(self.size - 1, 0, -1):
+            self.min_tree[p] = min(self.min_tree[2 * p],
+                                   self.min_tree[2 * p + 1])
+            if limits:
+                self.fit_tree[p] = min(self.fit_tree[2 * p],
+                                       self.fit_tree[2 * p + 1])
+
+    def __getitem__(self, worker_idx):
+        return self.loads[worker_idx]
+
+    def min_key(self, worker_idx):
+        if self.weights:
+            return (1.0 * (self.loads[worker_idx] + self.offset) /
+                    self.weights[worker_idx])
+        return self.loads[worker_idx] + self.offset
+
+    def add(self, worker_idx, delta):
+        self.loads[worker_idx] += delta
+        self.update(self.min_tree, worker_idx, self.min_key(worker_idx))
+        if self.fit_tree:
+            self.update(self.fit_tree, worker_idx,
+                        self.loads[worker_idx] - self.limits[worker_idx])
+
+    def update(self, tree, worker_idx, key):
+        p = self.size + worker_idx
+        tree[p] = key
+        p //= 2
+        while p:
+            tree[p] = min(tree[2 * p], tree[2 * p + 1])
+            p //= 2
+
+    def least_loaded(self):
+        tree = self.min_tree
+        p = 1
+        while p < self.size:
+            p *= 2
+            if tree[p] > tree[p + 1]:
+                p += 1
+        return p - self.size
+
+    def min_load(self):
+        return self.loads[self.least_loaded()]
+
+    def first_fit(self):
+        # Return -1 if every worker is at its limit
+        tree = self.fit_tree
+        if tree[1] >= 0:
+            return -1
+        p = 1
+        while p < self.size:
+            p *= 2
+            if tree[p] >= 0:
+                p += 1
+        return p - self.size
@@ -0,0 +1,42 @@
+import simpy
+
+
+class Engine(object):
+    # Interface the simulation model relies on. Besides the calendar
+    # primitives (now, call_at, call_later, run) a backend provides the
+    # simpy-style factories used by the hosts, schedulers and generators.
+
+    now = 0
+
+    def call_at(self, time, callback):
+        raise NotImplementedError("Engine.call_at shouldn't be called")
+
+    def call_later(self, delay, callback):
+        raise NotImplementedError("Engine.call_later shouldn't be called")
+
+    def run(self, until):
+        raise NotImplementedError("Engine.run shouldn't be called")
+
+    def event(self):
+        raise NotImplementedError("Engine.event shouldn't be called")
+
+    def timeout(self, delay, value=None):
+        raise NotImplementedError("Engine.timeout shouldn't be called")
+
+    def process(self, generator):
+        raise NotImplementedError("Engine.process shouldn't be called")
+
+    def resource(self, capacity=1):
+        raise NotImplementedError("Engine.resource shouldn't be called")
+
+
+class SimpyEngine(simpy.Environment, Engine):
+
+    def call_at(self, time, callback):
+        self.call_later(time - self.now, callback)
+
+    def call_later(self, delay, callback):
+        self.timeout(delay).callbacks.append(lambda event: callback())
+
+    def resource(self, capacity=1):
+        return simpy.Resource(self, capacity=capacity)
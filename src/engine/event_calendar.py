@@ -0,0 +1,162 @@
+import heapq
+import itertools
+import collections
+
+from engine.engine import Engine
+
+PENDING = object()
+
+
+class Event(object):
+    __slots__ = ('env', 'callbacks', 'value')
+
+    def __init__(self, env):
+        self.env = env
+        self.callbacks = []
+        self.value = PENDING
+
+    @property
+    def triggered(self):
+        return self.value is not PENDING
+
+    @property
+    def processed(self):
+        return self.callbacks is None
+
+    def succeed(self, value=None):
+        if self.value is not PENDING:
+            raise RuntimeError("Event has already been triggered")
+        self.value = value
+        self.env.call_later(0, self._process)
+        return self
+
+    def _process(self):
+        callbacks, self.callbacks = self.callbacks, None
+        for callback in callbacks:
+            callback(self)
+
+
+class Timeout(Event):
+    __slots__ = ()
+
+    def __init__(self, env, delay, value=None):
+        if delay < 0:
+            raise ValueError("Negative delay {}".format(delay))
+        self.env = env
+        self.callbacks = []
+        self.value = value
+        env.call_later(delay, self._process)
+
+
+class Process(Event):
+    __slots__ = ('generator',)
+
+    def __init__(self, env, generator):
+        super(Process, self).__init__(env)
+        self.generator = generator
+        env.call_urgent(self._start)
+
+    def _start(self):
+        self._step(None)
+
+    def _resume(self, event):
+        self._step(event.value)
+
+    def _step(self, value):
+        # Run the generator until it waits on an event that has not been
+        # processed yet. Exceptions are not turned into failed events, they
+        # propagate straight out of CalendarEngine.run
+        generator = self.generator
+        while True:
+            try:
+                event = generator.send(value)
+            except StopIteration as stop:
+                self.succeed(stop.value)
+                return
+            if event.callbacks is not None:
+                event.callbacks.append(self._resume)
+                return
+            value = event.value
+
+
+class Resource(object):
+
+    def __init__(self, env, capacity=1):
+        self.env = env
+        self.capacity = capacity
+        self.users = []
+        self.put_queue = collections.deque()
+
+    def request(self):
+        request = Event(self.env)
+        self.put_queue.append(request)
+        self._trigger_put()
+        return request
+
+    def release(self, request):
+        try:
+            self.users.remove(request)
+        except ValueError:
+            pass
+        # Waiting requests are granted once the release is processed
+        release = Event(self.env)
+        release.callbacks.append(self._trigger_put)
+        return release.succeed()
+
+    def _trigger_put(self, event=None):
+        if self.put_queue and len(self.users) < self.capacity:
+            request = self.put_queue.popleft()
+            self.users.append(request)
+            request.succeed()
+
+
+class CalendarEngine(Engine):
+    # Heap of (time, seq, callback) entries. The sequence number keeps
+    # callbacks scheduled for the same time in insertion order, which
+    # together with the urgent queue reproduces simpy's event ordering.
+
+    def __init__(self):
+        self.now = 0
+        self._queue = []
+        self._urgent = collections.deque()
+        self._seq = itertools.count()
+
+    def call_at(self, time, callback):
+        heapq.heappush(self._queue, (time, next(self._seq), callback))
+
+    def call_later(self, delay, callback):
+        heapq.heappush(self._queue, (self.now + delay, next(self._seq),
+                                     callback))
+
+    def call_urgent(self, callback):
+        # Runs before anything else scheduled for the current time, like
+        # simpy's URGENT priority used to start processes
+        self._urgent.append(callback)
+
+    def run(self, until):
+        if until <= self.now:
+            raise ValueError("until(={}) should be > the current simulation"
+                             " time".format(until))
+        queue = self._queue
+        urgent = self._urgent
+        heappop = heapq.heappop
+        while True:
+            while urgent:
+                urgent.popleft()()
+            if not queue or queue[0][0] >= until:
+                break
+            self.now, _, callback = heappop(queue)
+            callback()
+        self.now = until
+
+    def event(self):
+        return Event(self)
+
+    def timeout(self, delay, value=None):
+        return Timeout(self, delay, value)
+
+    def process(self, generator):
+        return Process(self, generator)
+
+    def resource(self, capacity=1):
+        return Resource(self, capacity)
@@ -1,25 +1,36 @@
 import sys
 import logging
 import simpy
-from queue.request_queue import *
+import heapq
+import functools
+import itertools
+import collections
+from queues.request_queue import *
 from scheduler.scheduler import *
 from scheduler.load_balancer import LoadBalancer
-from queue.dequeue_policy import *
+from queues.dequeue_policy import *
+from controller.load_index import LoadIndex
+from util import trace
+from util import saturation
 
+# Seconds a container stays warm after its last use, unless the flow sets
+# keep_alive
+DEFAULT_KEEP_ALIVE = 5
 
-class CoreGroup(object):
 
-    idle_cores = []
-    active_cores = []
+class CoreGroup(object):
 
     def __init__(self):
-        self.idle_cores = []
-        self.active_cores = []
+        # Idle cores wake up in the order they became idle
+        self.idle_cores = collections.deque()
+        # Insertion ordered dict used as a set of active cores, so that a
+        # finishing core is removed in constant time
+        self.active_cores = dict()
 
     def pop_one_idle_core(self):
         # Return first idle core
-        if len(self.idle_cores) != 0:
-            return self.idle_cores.pop(0)
+        if self.idle_cores:
+            return self.idle_cores.popleft()
         else:
             return None
 
@@ -36,10 +47,10 @@ class CoreGroup(object):
         self.idle_cores.append(core)
 
     def append_active_core(self, core):
-        self.active_cores.append(core)
+        self.active_cores[core] = None
 
     def core_become_idle(self, core):
-        self.active_cores.remove(core)
+        del self.active_cores[core]
         self.idle_cores.append(core)
 
     def set_notifier(self, notifier):
@@ -57,6 +68,17 @@ class SRPTQueueHost(object):
         self.worker_id = worker_id
         self.core_group = CoreGroup()
         self.queue = SRPTRequestQueue(env, -1, deq_cost, flow_config)
+        self.num_cores = num_cores
+
+        self.hot_data = WarmContainerPool(env, flow_config)
+        self.cold_start_cost = float(opts.cost_cold) / 1000
+        self.hot_start_cost = float(opts.cost_hot) / 1000
+
+        # Max-heap of running requests keyed by their projected completion
+        # time, so the one with the most remaining work is on top. Entries
+        # of requests that are no longer running are dropped lazily.
+        self.running = []
+        self.running_seq = itertools.count()
 
         for i in range(num_cores):
             new_core = CoreScheduler(env, controller, histograms, worker_id, i,
@@ -66,11 +88,6 @@ class SRPTQueueHost(object):
             self.core_group.append_idle_core(new_core)
 
     def receive_request(self, request):
-        logging.debug('Worker %d: Received request %d from flow %d at %f' %
-                      (self.worker_id, request.idx, request.flow_id,
-                       self.env.now))
-
-
         # Putting active cores into list
         activate_core = self.core_group.pop_one_idle_core()
         if activate_core:
@@ -78,40 +95,97 @@ class SRPTQueueHost(object):
             self.env.process(activate_core.become_active())
             self.core_group.append_active_core(activate_core)
         else:
-            logging.debug('Worker %d: Received request %d at %f'
-                          ' all cores busy' % (self.worker_id, request.idx,
-                          self.env.now))
-            min_exec_time = request.exec_time
-            min_idx = -1
-            i = 0
-            for core in self.core_group.active_cores:
-                if (((core.request.exec_time - (self.env.now -
-                    core.start_time)) > request.exec_time) and
-                    ((core.request.exec_time - (self.env.now -
-                    core.start_time)) > min_exec_time)):
-                    min_idx = i
-                    min_exec_time = (core.request.exec_time -
-                                     (self.env.now - core.start_time))
-            if min_idx == -1:
+            core = self.longest_running_core()
+            if (core is None or core.request.exec_time -
+                    (self.env.now - core.start_time) <= request.exec_time):
                 # Enqueue new request
-                # FIXME: Enqueue at the right position
                 self.queue.enqueue(request)
             else:
-                # Preempt currently running request
-                core = self.core_group.active_cores[min_idx]
-                logging.debug('Worker %d: Core %d preempting request %d at %f '
-                              'for request %d' % (self.worker_id, core.core_id,
-                              core.request.idx, self.env.now, request.idx))
+                # Preempt the request with the most remaining work
+                heapq.heappop(self.running)
+                if trace.ENABLED:
+                    trace.record(trace.PREEMPT, self.env.now, core.request,
+                                 self.worker_id, core.core_id)
                 core.request.exec_time -= self.env.now - core.start_time
                 self.queue.enqueue_front(core.request)
                 # Schedule the new request with the shortest execution time
                 self.queue.enqueue_front(request)
                 self.env.process(core.become_active())
 
+    def request_started(self, core, request):
+        heapq.heappush(self.running, (-(core.start_time + request.exec_time),
+                                      next(self.running_seq), core, request,
+                                      core.start_time))
+        # Keep finished entries from piling up below the top
+        if len(self.running) > 2 * self.num_cores:
+            self.running = [entry for entry in self.running
+                            if self.is_running(entry)]
+            heapq.heapify(self.running)
+
+    def is_running(self, entry):
+        _, _, core, request, start_time = entry
+        return (core.request is request and core.start_time == start_time and
+                core in self.core_group.active_cores)
+
+    def longest_running_core(self):
+        while self.running:
+            if self.is_running(self.running[0]):
+                return self.running[0][2]
+            heapq.heappop(self.running)
+        return None
+
     def core_become_idle(self, core, done_request):
         self.core_group.core_become_idle(core)
 
 
+class WarmContainerPool(object):
+    # Flows with a warm container on a host. As with the sweep this replaced,
+    # a container is torn down when a request of another flow starts on the
+    # host after the container has been idle for its flow's keep_alive
+    # seconds. Expired containers are found in expiry order.
+
+    def __init__(self, env, flow_config):
+        self.env = env
+        self.keep_alive = [flow.get('keep_alive', DEFAULT_KEEP_ALIVE)
+                           for flow in flow_config]
+        self.last_use = dict()
+        # Heap of (expiry, last use, flow_id); entries superseded by a later
+        # use of the same flow are skipped when they reach the top
+        self.timers = []
+
+    def __contains__(self, flow_id):
+        return flow_id in self.last_use
+
+    def __len__(self):
+        return len(self.last_use)
+
+    def keys(self):
+        return self.last_use.keys()
+
+    def touch(self, flow_id):
+        now = self.env.now
+        self.last_use[flow_id] = now
+        heapq.heappush(self.timers,
+                       (now + self.keep_alive[flow_id], now, flow_id))
+        # Drop superseded entries once they outnumber the live ones
+        if len(self.timers) > 2 * len(self.last_use) + 64:
+            self.timers = [(last_use + self.keep_alive[flow_id], last_use,
+                            flow_id)
+                           for flow_id, last_use in self.last_use.items()]
+            heapq.heapify(self.timers)
+
+    def evict(self):
+        # Tear down the containers idle for their keep-alive
+        now = self.env.now
+        while self.timers:
+            expiry, last_use, flow_id = self.timers[0]
+            if now - last_use < self.keep_alive[flow_id]:
+                break
+            heapq.heappop(self.timers)
+            if self.last_use.get(flow_id) == last_use:
+                del self.last_use[flow_id]
+
+
 class GlobalQueueHost(object):
 
     def __init__(self, env, controller, worker_id, num_cores, histograms,
@@ -120,17 +194,16 @@ class GlobalQueueHost(object):
         self.env = env
         self.worker_id = worker_id
         self.core_group = CoreGroup()
-        self.queue = FIFORequestQueue(env, -1, deq_cost, flow_config)
+        if opts.steal_work and opts.steal_hot:
+            # Hot stealing takes requests of specific flows out of the queue
+            self.queue = FlowIndexedFIFORequestQueue(env, -1, deq_cost,
+                                                     flow_config)
+        else:
+            self.queue = FIFORequestQueue(env, -1, deq_cost, flow_config)
 
-        self.all_hosts = controller.workers
-        self.hot_data = dict()
+        self.hot_data = WarmContainerPool(env, flow_config)
         self.cold_start_cost = float(opts.cost_cold) / 1000
         self.hot_start_cost = float(opts.cost_hot) / 1000
-        self.latency = controller.latency
-        self.steal_hot = opts.steal_hot
-        self.steal_maximum = opts.steal_maximum
-        self.steal_timer = opts.steal_timer
-        self.steal_threshold = opts.steal_threshold
 
         for i in range(num_cores):
             new_core = CoreScheduler(env, controller, histograms, worker_id, i,
@@ -139,14 +212,7 @@ class GlobalQueueHost(object):
             new_core.set_host(self)
             self.core_group.append_idle_core(new_core)
 
-        if opts.steal_work:
-            self.env.process(self.steal_work())
-
     def receive_request(self, request):
-        logging.debug('Worker %d: Received request %d from flow %d at %f' %
-                      (self.worker_id, request.idx, request.flow_id,
-                       self.env.now))
-
         self.queue.enqueue(request)
 
         # Putting active cores into list
@@ -156,63 +222,95 @@ class GlobalQueueHost(object):
             self.env.process(activate_core.become_active())
             self.core_group.append_active_core(activate_core)
 
+    def request_started(self, core, request):
+        pass
+
     def core_become_idle(self, core, done_request):
         self.core_group.core_become_idle(core)
 
-    def steal_work(self):
-        while True:
-            busiest_host = None
-            yield self.env.timeout(self.steal_timer)
 
-            if len(self.queue) > self.steal_threshold:
-                logging.debug(f"Worker {self.worker_id}: Skipping work stealing")
-                continue
+class StealCoordinator(object):
+    # Moves queued requests from the busiest hosts to lightly loaded ones.
+    # Host queue lengths are kept in an index updated on every enqueue and
+    # dequeue, so a stealing round costs O(W log W) instead of every host
+    # scanning every other host.
 
-            if self.steal_hot:
-                for host in self.all_hosts:
-                    union = host.hot_data.keys() | self.hot_data.keys()
-                    if len(union) > 0:
-                        if not busiest_host or len(host.queue) > len(busiest_host.queue):
-                            busiest_host = host
-
-                if busiest_host and busiest_host.worker_id != self.worker_id and len(busiest_host.queue) > 0:
-                    logging.debug(f"Worker {self.worker_id} stealing hot work {self.env.now}")
-
-                    # Acquire busiest queue lock
-                    req = busiest_host.queue.resource.request()
-                    yield req
-
-                    to_steal = list()
-                    for request in busiest_host.queue.q:
-                        if request.flow_id in self.hot_data:
-                            to_steal.append(request)
-                        if len(to_steal) == self.steal_maximum:
-                            break
-
-                    for request in to_steal:
-                        busiest_host.queue.q.remove(request)
-                        self.queue.enqueue(request)
-                        self.hot_data[request.flow_id] = self.env.now
-                        yield self.env.timeout(self.latency)
-            else:
-                for host in self.all_hosts:
-                    if not busiest_host or len(host.queue) > len(busiest_host.queue):
-                        busiest_host = host
+    def __init__(self, env, hosts, latency, opts):
+        self.env = env
+        self.hosts = hosts
+        self.latency = latency
+        self.steal_hot = opts.steal_hot
+        self.steal_maximum = opts.steal_maximum
+        self.steal_timer = opts.steal_timer
+        self.steal_threshold = opts.steal_threshold
 
-                # Don't steal work from ourselves
-                if busiest_host and busiest_host.worker_id != self.worker_id and len(busiest_host.queue) > 0:
-                    logging.debug(f"Worker {self.worker_id} stealing work {self.env.now}")
+        # Negative weights turn the least-loaded query into a busiest one
+        self.queue_lengths = LoadIndex(len(hosts), weights=[-1] * len(hosts))
+        for i, host in enumerate(hosts):
+            host.queue.watcher = functools.partial(self.queue_lengths.add, i)
+
+        self.env.process(self.run())
+
+    def run(self):
+        while True:
+            yield self.env.timeout(self.steal_timer)
 
-                    # Acquire busiest queue lock
-                    req = busiest_host.queue.resource.request()
-                    yield req
+            # Pair every light host with the busiest host left, counting
+            # the requests already promised to earlier thieves
+            pairs = list()
+            for i, host in enumerate(self.hosts):
+                if len(host.queue) > self.steal_threshold:
+                    logging.debug('Worker %d: Skipping work stealing',
+                                  host.worker_id)
+                    continue
+
+                # A host without warm containers has no hot work to steal
+                if self.steal_hot and len(host.hot_data) == 0:
+                    continue
+
+                victim = self.queue_lengths.least_loaded()
+                promised = min(self.steal_maximum, self.queue_lengths[victim])
+                # Don't steal work from ourselves
+                if victim == i or promised == 0:
+                    continue
+                self.queue_lengths.add(victim, -promised)
+                pairs.append((host, victim, promised))
+
+            for thief, victim, promised in pairs:
+                self.queue_lengths.add(victim, promised)
+            for thief, victim, promised in pairs:
+                self.env.process(self.steal(thief, self.hosts[victim]))
+
+    def steal(self, thief, victim):
+        logging.debug('Worker %d stealing %s work from worker %d at %f',
+                      thief.worker_id, 'hot' if self.steal_hot else 'any',
+                      victim.worker_id, self.env.now)
+
+        # Acquire the victim queue lock for the whole transfer
+        req = victim.queue.resource.request()
+        yield req
+
+        if self.steal_hot:
+            to_steal = victim.queue.take_flows(thief.hot_data.keys(),
+                                               self.steal_maximum)
+        else:
+            to_steal = list()
+            for i in range(self.steal_maximum):
+                request = victim.queue.dequeue()
+                if request is None:
+                    break
+                to_steal.append(request)
+
+        for request in to_steal:
+            if trace.ENABLED:
+                trace.record(trace.STEAL, self.env.now, request,
+                             thief.worker_id, victim.worker_id)
+            if self.steal_hot:
+                thief.hot_data.touch(request.flow_id)
+            thief.receive_request(request)
+            yield self.env.timeout(self.latency)
 
-                    for i in range(self.steal_maximum):
-                        request = busiest_host.queue.dequeue()
-                        if request is None:
-                            break
-                        self.queue.enqueue(request)
-                        yield self.env.timeout(self.latency)
+        victim.queue.resource.release(req)
 
 
 class MultiQueueHost(object):
@@ -316,6 +414,8 @@ class PerFlowQueueHost(object):
         logging.debug('Host: Received request %d from flow %d at %f' %
                       (request.idx, request.flow_id, self.env.now))
         if not self.queues.enqueue(request):
+            if saturation.ENABLED:
+                saturation.record_departure(request)
             self.histograms.drop_request(request.flow_id)
             return
 
@@ -0,0 +1,189 @@
+import heapq
+import logging
+import collections
+
+class GlobalDequeuePolicy(object):
+
+    queues = None
+    def __init__(self, env, queues):
+        self.env = env
+        self.queues = queues
+
+class SelectDequeuePolicy(GlobalDequeuePolicy):
+    def __init__(self, env, queues):
+        super(SelectDequeuePolicy, self).__init__(env, queues)
+
+    def select_queue(self):
+        raise ("SelectDequeuePolicy's select shouldn't be called")
+
+    def flow_changed(self, flow):
+        # Called after a request is added to or removed from a flow queue
+        pass
+
+    def dequeue(self):
+        if self.queues.empty():
+            return None
+
+        flow = self.select_queue()
+        request = self.queues[flow].dequeue()
+        self.flow_changed(flow)
+        return request
+
+class MaxKeyDequeuePolicy(SelectDequeuePolicy):
+    # Keeps the flows in a max-heap by key. A flow's key only changes along
+    # with its queue, so a new entry is pushed on every change and outdated
+    # entries are skipped once they reach the top.
+    def __init__(self, env, queues):
+        super(MaxKeyDequeuePolicy, self).__init__(env, queues)
+        self.keys = [None] * len(queues)
+        self.heap = []
+        for flow in range(len(queues)):
+            self.flow_changed(flow)
+
+    def key(self, flow):
+        raise ("MaxKeyDequeuePolicy's key shouldn't be called")
+
+    def flow_changed(self, flow):
+        key = self.key(flow)
+        if key == self.keys[flow]:
+            return
+        self.keys[flow] = key
+        # Ties go to the highest flow index, like a linear scan with >=
+        heapq.heappush(self.heap, (-key, -flow))
+        if len(self.heap) > 2 * len(self.keys) + 64:
+            self.heap = [(-key, -flow) for flow, key in enumerate(self.keys)]
+            heapq.heapify(self.heap)
+
+    def select_queue(self):
+        while True:
+            key, flow = self.heap[0]
+            if self.keys[-flow] == -key:
+                return -flow
+            heapq.heappop(self.heap)
+
+class LongestLengthDequeuePolicy(MaxKeyDequeuePolicy):
+    def key(self, flow):
+        return self.queues[flow].expected_length
+
+    def select_queue(self):
+        # Get the key of the flow with the longest queue
+        flow = super(LongestLengthDequeuePolicy, self).select_queue()
+        logging.debug("Dequeuing request from flow %d with length %f",
+                      flow, self.keys[flow])
+        return flow
+
+
+class LongestLoadDequeuePolicy(MaxKeyDequeuePolicy):
+    def key(self, flow):
+        return self.queues[flow].get_load()
+
+    def select_queue(self):
+        # Get the key of the flow with the highest load
+        flow = super(LongestLoadDequeuePolicy, self).select_queue()
+        logging.debug("Dequeuing request from flow %d with length %f",
+                      flow, self.keys[flow])
+        return flow
+
+class FirstPacketDequeuePolicy(SelectDequeuePolicy):
+    # First packet metrics are (now - origin) / slo, where the origin only
+    # depends on the request at the head of the flow queue. Flows with the
+    # same SLO age at the same rate, so their order only changes on enqueue
+    # and dequeue. Each SLO keeps its flows in a heap by origin, and only
+    # the oldest flow of each SLO is compared on dequeue.
+    def __init__(self, env, queues):
+        super(FirstPacketDequeuePolicy, self).__init__(env, queues)
+        self.origins = [None] * len(queues)
+        self.slo_heaps = dict()
+        for flow in range(len(queues)):
+            self.flow_changed(flow)
+
+    def origin(self, request):
+        raise ("FirstPacketDequeuePolicy's origin shouldn't be called")
+
+    def metric(self, flow):
+        raise ("FirstPacketDequeuePolicy's metric shouldn't be called")
+
+    def flow_changed(self, flow):
+        queue = self.queues[flow]
+        origin = None if queue.empty() else self.origin(queue.q[0])
+        if origin == self.origins[flow]:
+            return
+        self.origins[flow] = origin
+        if origin is None:
+            return
+
+        heap = self.slo_heaps.setdefault(queue.slo, [])
+        # Ties go to the highest flow index, like a linear scan with >=
+        heapq.heappush(heap, (origin, -flow))
+        if len(heap) > 2 * len(self.origins) + 64:
+            heap[:] = set(entry for entry in heap
+                          if self.origins[-entry[1]] == entry[0])
+            heapq.heapify(heap)
+
+    def select_queue(self):
+        best = None
+        for heap in self.slo_heaps.values():
+            while heap and self.origins[-heap[0][1]] != heap[0][0]:
+                heapq.heappop(heap)
+            if heap:
+                flow = -heap[0][1]
+                candidate = (self.metric(flow), flow)
+                if best is None or candidate > best:
+                    best = candidate
+        return best[1]
+
+
+class FirstPacketLatencyDequeuePolicy(FirstPacketDequeuePolicy):
+    def origin(self, request):
+        return request.start_time - request.exec_time
+
+    def metric(self, flow):
+        return self.queues[flow].get_first_packet_latency()
+
+    def select_queue(self):
+        # Get the key of the queue whose first packet is closest to violating
+        # its SLO.
+        flow = super(FirstPacketLatencyDequeuePolicy, self).select_queue()
+        logging.debug("Dequeuing request from flow %d with first packet slo"
+                      " metric %f", flow, self.metric(flow))
+        return flow
+
+class FirstPacketWaitDequeuePolicy(FirstPacketDequeuePolicy):
+    def origin(self, request):
+        return request.start_time
+
+    def metric(self, flow):
+        return self.queues[flow].get_first_packet_wait()
+
+    def select_queue(self):
+        # Get the key of the queue whose first packet is closest to violating
+        # its SLO knowing only its wait time.
+        flow = super(FirstPacketWaitDequeuePolicy, self).select_queue()
+        logging.debug("Dequeuing request from flow %d with first packet wait"
+                      " metric %f", flow, self.metric(flow))
+        return flow
+
+class RoundRobinDequeuePolicy(SelectDequeuePolicy):
+
+    def __init__(self, env, queues):
+        super(RoundRobinDequeuePolicy, self).__init__(env, queues)
+        # Ring of the flows with queued requests, in serving order
+        self.ring = collections.deque()
+        self.in_ring = [False] * len(queues)
+        for flow in range(len(queues)):
+            self.flow_changed(flow)
+
+    def flow_changed(self, flow):
+        if not self.in_ring[flow] and not self.queues[flow].empty():
+            self.ring.append(flow)
+            self.in_ring[flow] = True
+
+    def select_queue(self):
+        # Serve the flow at the head of the ring, it goes back to the tail
+        # if it still has requests after the dequeue
+        choose = self.ring.popleft()
+        self.in_ring[choose] = False
+
+        logging.debug("Dequeuing request from flow %d with Round Robin",
+                      choose)
+        return choose
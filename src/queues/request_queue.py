@@ -0,0 +1,318 @@
+import heapq
+import itertools
+import logging
+import collections
+
+class RequestQueue(object):
+
+    def __init__(self, env, size):
+        self.env = env
+        # If size = -1, assume infinite
+        self.size = size
+
+
+class FIFORequestQueue(RequestQueue):
+
+    def __init__(self, env, size, dequeue_time, flow_config):
+        super(FIFORequestQueue, self).__init__(env, size)
+        # TODO: If size is finite
+        self.q = collections.deque()
+        self.dequeue_time = dequeue_time
+
+        #Passing in this just so match the previous version
+        self.flow_config = flow_config
+
+        # Assuming queue can only be accessed once at a time
+        self.resource = env.resource(capacity=1)
+
+        # Called with the change in length when set, so that others can
+        # track the queue length without polling it
+        self.watcher = None
+
+    def enqueue(self, request):
+        self.q.append(request)
+        if self.watcher:
+            self.watcher(1)
+
+    def enqueue_front(self, request):
+        self.q.appendleft(request)
+        if self.watcher:
+            self.watcher(1)
+
+    def renqueue(self, request):
+        if (self.flow_config[request.flow_id]['enq_front']):
+            self.enqueue_front(request)
+        else:
+            self.enqueue(request)
+
+    def empty(self):
+        return len(self.q) == 0
+
+    def dequeue(self):
+        if len(self.q) == 0:
+            return None
+        if self.watcher:
+            self.watcher(-1)
+        return self.q.popleft()
+
+    def __len__(self):
+        return len(self.q)
+
+
+class FlowIndexedFIFORequestQueue(FIFORequestQueue):
+    # FIFO queue that also keeps the requests of each flow in their own
+    # sublist, so that the oldest requests of a set of flows can be taken
+    # without walking the whole queue. Entries are [seq, request] lists
+    # shared by both structures; entries taken out of a flow sublist are
+    # left behind in the main queue with their request set to None and
+    # skipped on dequeue.
+
+    def __init__(self, env, size, dequeue_time, flow_config):
+        super(FlowIndexedFIFORequestQueue, self).__init__(env, size,
+                                                          dequeue_time,
+                                                          flow_config)
+        self.flows = collections.defaultdict(collections.deque)
+        self.length = 0
+        self.seq = itertools.count()
+        self.front_seq = itertools.count(-1, -1)
+
+    def enqueue(self, request):
+        entry = [next(self.seq), request]
+        self.q.append(entry)
+        self.flows[request.flow_id].append(entry)
+        self.length += 1
+        if self.watcher:
+            self.watcher(1)
+
+    def enqueue_front(self, request):
+        entry = [next(self.front_seq), request]
+        self.q.appendleft(entry)
+        self.flows[request.flow_id].appendleft(entry)
+        self.length += 1
+        if self.watcher:
+            self.watcher(1)
+
+    def empty(self):
+        return self.length == 0
+
+    def dequeue(self):
+        while self.q:
+            request = self.q.popleft()[1]
+            if request is not None:
+                # Flow sublists keep the main queue order, so this is the
+                # head of its sublist
+                self.flows[request.flow_id].popleft()
+                self.length -= 1
+                if self.watcher:
+                    self.watcher(-1)
+                return request
+        return None
+
+    def take_flows(self, flows, count):
+        # Remove and return up to count of the oldest requests belonging to
+        # the given flows, in queue order
+        heads = [(self.flows[flow_id][0][0], flow_id) for flow_id in flows
+                 if self.flows.get(flow_id)]
+        heapq.heapify(heads)
+        taken = list()
+        while heads and len(taken) < count:
+            _, flow_id = heapq.heappop(heads)
+            sublist = self.flows[flow_id]
+            entry = sublist.popleft()
+            taken.append(entry[1])
+            entry[1] = None
+            if sublist:
+                heapq.heappush(heads, (sublist[0][0], flow_id))
+        self.length -= len(taken)
+        if self.watcher and taken:
+            self.watcher(-len(taken))
+        return taken
+
+    def __len__(self):
+        return self.length
+
+
+class SRPTRequestQueue(RequestQueue):
+
+    def __init__(self, env, size, dequeue_time, flow_config):
+        super(SRPTRequestQueue, self).__init__(env, size)
+        # TODO: If size is finite
+        # Heap of [rank, exec_time, seq, request] entries. Requests put at
+        # the front get decreasing negative ranks so they come out before
+        # everything else, most recent first. The sequence number keeps
+        # requests with equal execution times in FIFO order.
+        self.q = []
+        self.entries = dict()
+        self.seq = itertools.count()
+        self.front_rank = itertools.count(-1, -1)
+        self.dequeue_time = dequeue_time
+
+        #Passing in this just so match the previous version
+        self.flow_config = flow_config
+
+        # Assuming queue can only be accessed once at a time
+        self.resource = env.resource(capacity=1)
+
+    def push(self, rank, request):
+        entry = [rank, request.exec_time, next(self.seq), request]
+        self.entries[request] = entry
+        heapq.heappush(self.q, entry)
+
+    def enqueue(self, request):
+        self.push(0, request)
+
+    def enqueue_front(self, request):
+        self.push(next(self.front_rank), request)
+
+    def renqueue(self, request):
+        if (self.flow_config[request.flow_id]['enq_front']):
+            self.enqueue_front(request)
+        else:
+            self.enqueue(request)
+
+    def remove(self, request):
+        # Removed entries stay in the heap and are skipped when dequeued
+        self.entries.pop(request)[-1] = None
+
+    def empty(self):
+        return len(self.entries) == 0
+
+    def dequeue(self):
+        while self.q:
+            request = heapq.heappop(self.q)[-1]
+            if request is not None:
+                del self.entries[request]
+                return request
+        return None
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class PerFlowRequestQueue(RequestQueue):
+
+    def __init__(self, env, size, load_ratio, num_cores,
+                 flow_config):
+        super(PerFlowRequestQueue, self).__init__(env, size)
+        # TODO: If size is finite
+        self.q = collections.deque()
+        self.expected_length = 0.0
+        self.load_ratio = load_ratio
+        self.num_cores = num_cores
+        self.flow_config = flow_config
+        self.slo = self.flow_config["slo"]
+        self.enq_front = self.flow_config['enq_front']
+
+    def enqueue(self, request):
+        self.q.append(request)
+        self.expected_length += request.expected_length
+        return True
+
+    def enqueue_front(self, request):
+        self.q.appendleft(request)
+        self.expected_length += request.expected_length
+
+    def renqueue(self, request):
+        if self.enq_front:
+            self.enqueue_front(request)
+        else:
+            self.enqueue(request)
+
+    def empty(self):
+        return len(self.q) == 0
+
+    def dequeue(self):
+        if self.empty():
+            return None
+
+        request = self.q.popleft()
+        self.expected_length -= request.expected_length
+        return request
+
+    def get_first_packet_latency(self):
+        if self.empty():
+            return 0
+
+        request = self.q[0]
+        return ((self.env.now - request.start_time + request.exec_time) /
+                self.slo)
+
+    def get_first_packet_wait(self):
+        if self.empty():
+            return -1
+
+        request = self.q[0]
+        return ((self.env.now - request.start_time) /
+                self.slo)
+
+    def get_load(self):
+        if self.empty():
+            return 0
+        else:
+            return (self.expected_length / self.slo / (self.load_ratio *
+                                                       self.num_cores))
+
+    def __len__(self):
+        return len(self.q)
+
+
+class DropFlowRequestQueue(PerFlowRequestQueue):
+
+    def enqueue(self, request):
+        self.expected_length += request.expected_length
+        if self.get_load() > 1.0:
+            self.expected_length -= request.expected_length
+            return False
+        else:
+            self.q.append(request)
+            return True
+
+class PerFlowRequestQueueGroup(RequestQueue):
+
+    def __init__(self, env, dequeue_time, flow_config):
+        super(PerFlowRequestQueueGroup, self).__init__(env, len(flow_config))
+        self.qs = []
+        # Number of requests queued over all flows
+        self.length = 0
+        self.dequeue_time = dequeue_time
+        self.flow_config = flow_config
+        # Assuming queue can only be accessed once at a time
+        self.resource = env.resource(capacity=1)
+
+    def set_dequeue_policy(self, dqp):
+        self.dequeue_policy = dqp
+
+    def enqueue(self, request):
+        if not self.qs[request.flow_id].enqueue(request):
+            return False
+        self.length += 1
+        self.dequeue_policy.flow_changed(request.flow_id)
+        return True
+
+    def renqueue(self, request):
+        q = self.qs[request.flow_id]
+        length = len(q)
+        q.renqueue(request)
+        # Flow queues that drop requests may turn it down
+        if len(q) != length:
+            self.length += 1
+            self.dequeue_policy.flow_changed(request.flow_id)
+
+    def add_queue(self, q):
+        self.qs.append(q)
+
+    def dequeue(self):
+        request = self.dequeue_policy.dequeue()
+        if request is not None:
+            self.length -= 1
+        return request
+
+    def empty(self):
+        return self.length == 0
+
+    def __getitem__(self, key):
+        return self.qs[key]
+
+    def __len__(self):
+        return len(self.qs)
+
@@ -1,32 +1,48 @@
 import numpy as np
 
+from request.sampler import *
+
 
 class InterArrivalGenerator(object):
-    def __init__(self, mean, opts=None):
+    def __init__(self, mean, opts=None, rng=None):
         self.mean = mean
 
     def next(self):
         return 1
 
+    def reseed(self, rng):
+        pass
+
 
 class PoissonArrivalGenerator(InterArrivalGenerator):
+    def __init__(self, mean, opts=None, rng=None):
+        InterArrivalGenerator.__init__(self, mean, opts, rng)
+        self.sampler = ExponentialSampler(rng, self.mean)
+
     def next(self):
-        return np.random.exponential(self.mean)
+        return self.sampler.next()
+
+    def reseed(self, rng):
+        self.sampler.reseed(rng)
 
 
 class LogNormalArrivalGenerator(InterArrivalGenerator):
-    def __init__(self, mean, opts=None):
-        InterArrivalGenerator.__init__(self, mean, opts)
+    def __init__(self, mean, opts=None, rng=None):
+        InterArrivalGenerator.__init__(self, mean, opts, rng)
         self.scale = float(opts["std_dev_arrival"]**2)
         # Calculate the mean of the underlying normal distribution
         self.mean = np.log(mean**2 / np.sqrt(mean**2 + self.scale))
         self.scale = np.sqrt(np.log(self.scale / mean**2 + 1))
+        self.sampler = LogNormalSampler(rng, self.mean, self.scale)
 
     def next(self):
-        return np.random.lognormal(self.mean, self.scale)
+        return self.sampler.next()
+
+    def reseed(self, rng):
+        self.sampler.reseed(rng)
 
 class BurstyArrivalGenerator(InterArrivalGenerator):
-    def __init__(self, mean, opts):
+    def __init__(self, mean, opts, rng=None):
         self.idx = 0
         self.burst_count = opts.get("burst_count", 100)
         self.rate = opts.get("req_per_sec", 5)
@@ -38,7 +54,7 @@ class BurstyArrivalGenerator(InterArrivalGenerator):
         return base + (1 / self.rate)
 
 class TrickleArrivalGenerator(InterArrivalGenerator):
-    def __init__(self, mean, opts):
+    def __init__(self, mean, opts, rng=None):
         self.rate = opts.get("num_req", 10)
         self.span = opts.get("req_span", 60)
 
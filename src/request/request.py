@@ -1,6 +1,12 @@
 
 
 class Request(object):
+    # Saturated runs keep millions of requests queued, so avoid a per
+    # instance __dict__
+    __slots__ = ('idx', 'exec_time', 'total_time', 'start_time', 'flow_id',
+                 'expected_length', 'dispatch_time', 'run_start_time',
+                 'cold_start')
+
     def __init__(self, idx, exec_time, start_time, flow_id, expected_length):
         self.idx = idx
         self.exec_time = exec_time
@@ -8,6 +14,10 @@ class Request(object):
         self.start_time = start_time
         self.flow_id = flow_id
         self.expected_length = exec_time
+        # Set once the request reaches a worker and first runs on a core
+        self.dispatch_time = -1.0
+        self.run_start_time = -1.0
+        self.cold_start = False
 
     def __lt__(self, other):
         return self.exec_time < other.exec_time
@@ -1,8 +1,11 @@
 import math
-import random
 from request.request import Request
+from util import saturation
 import numpy as np
 
+from request.sampler import *
+
+
 class RequestGenerator(object):
 
     flow_id = 1
@@ -23,6 +26,11 @@ class RequestGenerator(object):
     def set_flow_id(self, flow_id):
         self.flow_id = flow_id
 
+    def reseed(self, arrival_rng, service_rng):
+        # Continue drawing arrivals and execution times from new streams
+        self.inter_gen.reseed(arrival_rng)
+        self.sampler.reseed(service_rng)
+
     def run(self):
         idx = 0
         while True:
@@ -54,12 +62,15 @@ class MultipleRequestGenerator(object):
 
     def receive_request(self, request):
         request.idx = self.idx
+        if saturation.ENABLED:
+            saturation.record_arrival(request)
         self.host.receive_request(request)
         self.idx += 1
 
 
 class HeavyTailRequestGenerator(RequestGenerator):
-    def __init__(self, hist, env, host, inter_gen, num_cores, opts):
+    def __init__(self, hist, env, host, inter_gen, num_cores, opts,
+                 arrival_rng, service_rng):
         # Tail percent of 2 means that 2% of requests require "tail latency"
         # execution time, the others require "latency" execution
         # time.
@@ -68,16 +79,22 @@ class HeavyTailRequestGenerator(RequestGenerator):
         self.heavy_exec_time = opts["heavy_time"]
         self.heavy_percent = opts["heavy_per"]
         self.hist = hist
+        # Draws which requests are heavy
+        self.rng = service_rng
         self.mean = (self.heavy_exec_time * (self.heavy_percent / 100.0) +
                      self.exec_time * ((100 - self.heavy_percent) / 100.0))
         inv_load = 1.0 / self.load
         mean = inv_load * self.mean / self.num_cores
-        self.inter_gen = inter_gen(mean, opts)
-        if opts.has_key("request_types"):
+        self.inter_gen = inter_gen(mean, opts, arrival_rng)
+        if "request_types" in opts:
             self.request_types = opts["request_types"]
         else:
             self.request_types = 0
 
+    def reseed(self, arrival_rng, service_rng):
+        self.inter_gen.reseed(arrival_rng)
+        self.rng = service_rng
+
     def run(self):
         idx = 0
         while True:
@@ -88,14 +105,14 @@ class HeavyTailRequestGenerator(RequestGenerator):
 
             # Generate request
             # NOTE Percentage must be integer
-            is_heavy = random.randint(0, 999) < self.heavy_percent * 10
+            is_heavy = self.rng.integers(1000) < self.heavy_percent * 10
             exec_time = self.heavy_exec_time if is_heavy else self.exec_time
 
             if self.request_types > 0:
-                if random.randInt(0, 99) < 98:
+                if self.rng.integers(100) < 98:
                     idx = 0
                 else:
-                    idx = random.randInt(1,49)
+                    idx = int(self.rng.integers(1, 50))
 
             self.host.receive_request(Request(idx, exec_time, self.env.now,
                                               self.flow_id, self.mean))
@@ -104,12 +121,14 @@ class HeavyTailRequestGenerator(RequestGenerator):
 
 
 class ExponentialRequestGenerator(RequestGenerator):
-    def __init__(self, hist, env, host, inter_gen, num_cores, opts):
+    def __init__(self, hist, env, host, inter_gen, num_cores, opts,
+                 arrival_rng, service_rng):
         RequestGenerator.__init__(self, env, host, opts["load"], num_cores)
         self.mean = float(opts["mean"])
         self.hist = hist
         arrival_mean = self.mean / self.load / self.num_cores
-        self.inter_gen = inter_gen(arrival_mean, opts)
+        self.inter_gen = inter_gen(arrival_mean, opts, arrival_rng)
+        self.sampler = ExponentialSampler(service_rng, self.mean)
 
     def run(self):
         idx = 0
@@ -119,7 +138,7 @@ class ExponentialRequestGenerator(RequestGenerator):
             s = self.inter_gen.next()
             yield self.env.timeout(s)
             self.hist.add_request()
-            exec_time = np.random.exponential(self.mean)
+            exec_time = self.sampler.next()
 
             self.host.receive_request(Request(idx, exec_time, self.env.now,
                                               self.flow_id, self.mean))
@@ -128,7 +147,8 @@ class ExponentialRequestGenerator(RequestGenerator):
 
 
 class LogNormalRequestGenerator(RequestGenerator):
-    def __init__(self, hist, env, host, inter_gen, num_cores, opts):
+    def __init__(self, hist, env, host, inter_gen, num_cores, opts,
+                 arrival_rng, service_rng):
         RequestGenerator.__init__(self, env, host, opts["load"], num_cores)
 
         self.mean = opts["mean"]
@@ -138,7 +158,8 @@ class LogNormalRequestGenerator(RequestGenerator):
         self.log_mean = math.exp(self.mean + (self.std * self.std) / 2)
         arrival_mean = self.log_mean / self.load / self.num_cores
 
-        self.inter_gen = inter_gen(arrival_mean, opts)
+        self.inter_gen = inter_gen(arrival_mean, opts, arrival_rng)
+        self.sampler = LogNormalSampler(service_rng, self.mean, self.std)
 
     def run(self):
         idx = 0
@@ -148,7 +169,7 @@ class LogNormalRequestGenerator(RequestGenerator):
             s = self.inter_gen.next()
             yield self.env.timeout(s)
             self.hist.add_request()
-            exec_time = np.random.lognormal(self.mean, self.std)
+            exec_time = self.sampler.next()
 
             self.host.receive_request(Request(idx, exec_time, self.env.now,
                                               self.flow_id, self.log_mean))
@@ -156,7 +177,8 @@ class LogNormalRequestGenerator(RequestGenerator):
 
 
 class ParetoRequestGenerator(RequestGenerator):
-    def __init__(self, hist, env, host, inter_gen, num_cores, opts):
+    def __init__(self, hist, env, host, inter_gen, num_cores, opts,
+                 arrival_rng, service_rng):
         RequestGenerator.__init__(self, env, host, opts["load"], num_cores)
 
         self.scale = 1 + np.sqrt(1.0 + opts["mean"]**2 /
@@ -166,7 +188,8 @@ class ParetoRequestGenerator(RequestGenerator):
         arrival_mean = opts["mean"] / self.load / self.num_cores
 
         self.hist = hist
-        self.inter_gen = inter_gen(arrival_mean, opts)
+        self.inter_gen = inter_gen(arrival_mean, opts, arrival_rng)
+        self.sampler = ParetoSampler(service_rng, self.scale, self.mu)
         self.mean = opts["mean"]
 
     def run(self):
@@ -177,20 +200,25 @@ class ParetoRequestGenerator(RequestGenerator):
             yield self.env.timeout(s)
 
             self.hist.add_request()
-            exec_time = (np.random.pareto(self.scale) + 1) * self.mu
+            exec_time = self.sampler.next()
             self.host.receive_request(Request(idx, exec_time, self.env.now,
                                               self.flow_id, self.mean))
             idx += 1
 
 
 class NormalRequestGenerator(RequestGenerator):
-    def __init__(self, hist, env, host, inter_gen, num_cores, opts):
+    def __init__(self, hist, env, host, inter_gen, num_cores, opts,
+                 arrival_rng, service_rng):
         RequestGenerator.__init__(self, env, host, opts["load"], num_cores)
 
         self.mu = opts["mean"]
         self.std = opts["std_dev_request"]
+        self.hist = hist
         self.inter_gen = inter_gen(opts["mean"] / self.load / self.num_cores,
-                                   opts)
+                                   opts, arrival_rng)
+        # Execution times are kept within [0, 2 * mu]
+        self.sampler = TruncatedNormalSampler(service_rng, self.mu, self.std,
+                                              0, 2 * self.mu)
         self.mean = opts["mean"]
 
     def run(self):
@@ -201,9 +229,7 @@ class NormalRequestGenerator(RequestGenerator):
             yield self.env.timeout(s)
 
             self.hist.add_request()
-            exec_time = -1
-            while (exec_time < 0 or exec_time > 2 * self.mu):
-                exec_time = np.random.normal(self.mu, self.std)
+            exec_time = self.sampler.next()
 
             self.host.receive_request(Request(idx, exec_time, self.env.now,
                                               self.flow_id, self.mean))
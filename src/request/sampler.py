@@ -0,0 +1,85 @@
+import numpy as np
+
+# Number of values drawn from the random generator at a time
+BLOCK_SIZE = 1 << 16
+
+
+class BlockSampler(object):
+    # Serves values one at a time from blocks drawn with a single numpy
+    # call, which avoids paying the per-call numpy overhead per request
+
+    def __init__(self, rng, block_size=BLOCK_SIZE):
+        self.rng = rng
+        self.block_size = block_size
+        self.block = []
+        self.pos = 0
+
+    def draw(self, size):
+        raise NotImplementedError("BlockSampler's draw shouldn't be called")
+
+    def reseed(self, rng):
+        # Values left in the current block came from the old generator
+        self.rng = rng
+        self.block = []
+        self.pos = 0
+
+    def next(self):
+        if self.pos == len(self.block):
+            # Python floats are cheaper to index and compute with than
+            # numpy scalars
+            self.block = self.draw(self.block_size).tolist()
+            self.pos = 0
+        value = self.block[self.pos]
+        self.pos += 1
+        return value
+
+
+class ExponentialSampler(BlockSampler):
+    def __init__(self, rng, scale, block_size=BLOCK_SIZE):
+        super(ExponentialSampler, self).__init__(rng, block_size)
+        self.scale = scale
+
+    def draw(self, size):
+        return self.rng.exponential(self.scale, size)
+
+
+class LogNormalSampler(BlockSampler):
+    def __init__(self, rng, mean, sigma, block_size=BLOCK_SIZE):
+        super(LogNormalSampler, self).__init__(rng, block_size)
+        self.mean = mean
+        self.sigma = sigma
+
+    def draw(self, size):
+        return self.rng.lognormal(self.mean, self.sigma, size)
+
+
+class ParetoSampler(BlockSampler):
+    # Pareto distribution with shape a and minimum value mu
+    def __init__(self, rng, a, mu, block_size=BLOCK_SIZE):
+        super(ParetoSampler, self).__init__(rng, block_size)
+        self.a = a
+        self.mu = mu
+
+    def draw(self, size):
+        return (self.rng.pareto(self.a, size) + 1) * self.mu
+
+
+class TruncatedNormalSampler(BlockSampler):
+    # Normal distribution restricted to [low, high] by rejection, done on
+    # whole blocks at a time
+    def __init__(self, rng, mu, std, low, high, block_size=BLOCK_SIZE):
+        super(TruncatedNormalSampler, self).__init__(rng, block_size)
+        self.mu = mu
+        self.std = std
+        self.low = low
+        self.high = high
+
+    def draw(self, size):
+        accepted = []
+        remaining = size
+        while remaining > 0:
+            values = self.rng.normal(self.mu, self.std, size)
+            values = values[(values >= self.low) & (values <= self.high)]
+            accepted.append(values[:remaining])
+            remaining -= len(accepted[-1])
+        return np.concatenate(accepted)
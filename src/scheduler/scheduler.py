@@ -1,5 +1,10 @@
 import logging
 
+from util import trace
+from util import timeseries
+from util import request_log
+from util import saturation
+
 
 class ShinjukuScheduler(object):
     # This is for if we want to add request to another queue
@@ -67,6 +72,8 @@ class ShinjukuScheduler(object):
                           .format(done_request.idx, self.env.now))
             flow_id = done_request.flow_id
             latency = self.env.now - done_request.start_time
+            if saturation.ENABLED:
+                saturation.record_departure(done_request)
             self.histograms.record_value(flow_id, latency)
 
         if not self.active:
@@ -128,32 +135,36 @@ class CoreScheduler(object):
         self.start_time = self.env.now
 
     def process_request(self, request):
-        logging.debug('Worker {}: Assigning request {} to core {} at {}'
-                      .format(self.worker_id, request.idx, self.core_id,
-                              self.env.now))
+        if trace.ENABLED:
+            trace.record(trace.START, self.env.now, request, self.worker_id,
+                         self.core_id)
         self.request = request
         self.start_time = self.env.now
+        if request.run_start_time < 0:
+            request.run_start_time = self.env.now
+        self.host.request_started(self, request)
 
         time_slice = self.flow_config[request.flow_id].get('time_slice')
         if (time_slice == 0 or time_slice >= request.exec_time):
 
             # Take into account start costs (cold/hot)
             start_cost = self.host.cold_start_cost
-            data_temp = "COLD"
+            start_event = trace.COLD_START
             if request.flow_id in self.host.hot_data:
-                data_temp = "HOT"
+                start_event = trace.HOT_START
                 start_cost = self.host.hot_start_cost
-
-            # Tear down hot containers if not used for specific amount of time
-            stale = list()
-            for key, val in self.host.hot_data.items():
-                if key != self.request.flow_id and self.env.now - val >= 5:
-                    stale.append(key)
-            for key in stale:
-                del self.host.hot_data[key]
-
-            self.host.hot_data[request.flow_id] = self.env.now
-            logging.debug(f"Worker {self.worker_id}.{self.core_id}: Request {self.request.idx} Type:{self.request.flow_id} {data_temp}!!")
+            else:
+                request.cold_start = True
+                if timeseries.ENABLED:
+                    timeseries.record_cold_start()
+
+            # Tear down containers not used for their keep-alive, and keep
+            # this one warm
+            self.host.hot_data.evict()
+            self.host.hot_data.touch(request.flow_id)
+            if trace.ENABLED:
+                trace.record(start_event, self.env.now, request,
+                             self.worker_id, self.core_id)
             yield self.env.timeout(start_cost)
 
             yield self.env.timeout(request.exec_time)
@@ -164,24 +175,29 @@ class CoreScheduler(object):
                 #              self.env.now))
                 return
             latency = self.env.now - self.request.start_time
-            logging.debug('Worker {}: Request {} Latency {}'.format
-                          (self.worker_id, self.request.idx, latency))
+            if trace.ENABLED:
+                trace.record(trace.COMPLETE, self.env.now, self.request,
+                             self.worker_id, self.core_id)
+            if timeseries.ENABLED:
+                timeseries.record_completion(latency)
+            if request_log.ENABLED:
+                request_log.record(self.request, self.worker_id, self.core_id,
+                                   self.env.now)
+            if saturation.ENABLED:
+                saturation.record_departure(self.request)
             flow_id = self.request.flow_id
             self.histograms.record_value(flow_id, latency, self.request.total_time,
                                          self.request.start_time)
             self.controller.receive_completion(self.request, self.worker_id)
-            logging.debug('Worker {}: Request {} finished execution at core {}'
-                          ' at {}'.format(self.worker_id, self.request.idx,
-                                          self.core_id, self.env.now))
         else:
             yield self.env.timeout(time_slice + float(
                                    self.flow_config[request.flow_id].
                                    get('preemption')))
             request.exec_time -= time_slice
             request.expected_length -= time_slice
-            logging.debug('Worker {}: Request {} preempted at core {} at {}'
-                          .format(self.worker_id, request.idx, self.core_id,
-                                  self.env.now))
+            if trace.ENABLED:
+                trace.record(trace.PREEMPT, self.env.now, request,
+                             self.worker_id, self.core_id)
 
             # FIXME Add enqueue cost/lock
             # Add the unfinished request to the queue
@@ -195,26 +211,27 @@ class CoreScheduler(object):
 
         # Become idle only after process finishes
         self.active = True
-        logging.debug("CoreScheduler: Core {} becomes active at {}"
-                      .format(self.core_id, self.env.now))
         while not self.queue.empty():
             # Keep waiting for request
             req = self.queue.resource.request()
 
             # Wait for my turn of the lock
-            logging.debug("CoreScheduler: Core {} acquiring lock"
-                          .format(self.core_id, self.env.now))
             yield req
-            logging.debug("CoreScheduler: Core {} got lock at {}"
-                          .format(self.core_id, self.env.now))
 
-            request = self.queue.dequeue()
+            next_request = self.queue.dequeue()
+            if next_request is None:
+                # Another core drained the queue while we waited for the lock
+                self.queue.resource.release(req)
+                break
+            request = next_request
 
             total_time = self.env.now - request.start_time + request.exec_time
             target_slo = self.flow_config[request.flow_id].get('slo',
                                                                float('inf'))
             if ((total_time > target_slo and
                  self.flow_config[request.flow_id].get('drop'))):
+                if saturation.ENABLED:
+                    saturation.record_departure(request)
                 self.histograms.drop_request(request.flow_id)
                 self.env.timeout(0.0)
                 self.queue.resource.release(req)
@@ -233,8 +250,6 @@ class CoreScheduler(object):
                     if self.start_time != start_time:
                         return
 
-        logging.debug("CoreScheduler: Core {} becomes idle at {}"
-                      .format(self.core_id, self.env.now))
         self.active = False
 
         if self.host:
@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+import tempfile
+
+# Bump whenever a change to the simulator can change its results, so that
+# results cached by older versions are no longer found. That is any change
+# to:
+# - the random streams: seeding, the order values are drawn in, or the
+#   distributions they are drawn from
+# - the model: scheduling, queueing, dispatching or the order in which
+#   simultaneous events run
+# - the default value of an option in RESULT_OPTIONS, or the meaning of a
+#   flow configuration field
+# - the results themselves: the fields reported and how they are computed
+# Changes to the options that only control the output, or to the speed of
+# the simulator when its results stay the same, need no bump.
+MODEL_VERSION = 5
+
+# Options that change the simulation results. The rest only control what is
+# printed or written out. The event engine is not one of them: the engines
+# run the same events in the same order, so results computed with either
+# are shared.
+RESULT_OPTIONS = ['seed', 'sim_time', 'controller_type', 'host_type',
+                  'power_of_d', 'deq_cost', 'cores', 'workers', 'window',
+                  'capacity', 'latency', 'steal_work', 'steal_hot',
+                  'steal_maximum', 'steal_timer', 'steal_threshold',
+                  'cost_cold', 'cost_hot', 'queue_per_core', 'queue_policy',
+                  'stop_precision', 'stop_metrics', 'stop_batch',
+                  'abort_saturated', 'saturation_interval']
+
+
+def cacheable(opts):
+    # Runs that write traces or records out are wanted for their side
+    # effects, so they always run
+    return not (opts.print_values or opts.trace_file or opts.timeseries_file)
+
+
+def cache_key(flow_config, opts):
+    canonical = json.dumps({'version': MODEL_VERSION,
+                            'flows': flow_config,
+                            'options': dict((name, getattr(opts, name))
+                                            for name in RESULT_OPTIONS)},
+                           sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    # On-disk store of simulation results, one JSON file per key spread over
+    # subdirectories named after the first two characters of the key
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def __getitem__(self, key):
+        with open(self.path(key)) as f:
+            return json.load(f)
+
+    def __setitem__(self, key, results):
+        # Write to a temporary file first so that readers never see a
+        # partially written result
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(results, f)
+        os.replace(tmp_path, path)
+
+
+class SweepStore(object):
+    # Journal of the results of a single sweep, one JSON line per completed
+    # job, appended and synced as soon as the job finishes. Reopening the
+    # journal loads the jobs completed so far; a line cut short by a crash
+    # is dropped and written again when its job is rerun.
+
+    def __init__(self, filename):
+        self.results = dict()
+        valid = 0
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        break
+                    if not line.endswith(b'\n'):
+                        break
+                    self.results[entry['key']] = entry['results']
+                    valid += len(line)
+        self.output = open(filename, 'ab')
+        self.output.truncate(valid)
+
+    def __contains__(self, key):
+        return key in self.results
+
+    def __getitem__(self, key):
+        return self.results[key]
+
+    def __setitem__(self, key, results):
+        self.results[key] = results
+        line = json.dumps({'key': key, 'results': results}) + '\n'
+        self.output.write(line.encode('utf-8'))
+        self.output.flush()
+        os.fsync(self.output.fileno())
+
+    def close(self):
+        self.output.close()
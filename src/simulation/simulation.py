@@ -0,0 +1,470 @@
+import os
+import sys
+import copy
+import json
+import collections
+import traceback
+import random
+import signal
+import argparse
+import numpy as np
+
+from util.histogram import *
+from util import trace
+from util import timeseries
+from util import request_log
+from util import stopping
+from util import saturation
+
+from engine.engine import *
+from engine.event_calendar import CalendarEngine
+
+from host.host import *
+from controller.controller import *
+from request.request_generator import *
+from request.interarrival_generator import *
+
+
+gen_dict = {
+    'heavy_tail': 'HeavyTailRequestGenerator',
+    'poisson_arrival': 'PoissonArrivalGenerator',
+    'lognormal_arrival': 'LogNormalArrivalGenerator',
+    'base_arrival': 'InterArrivalGenerator',
+    'bursty_arrival': 'BurstyArrivalGenerator',
+    'trickle_arrival': 'TrickleArrivalGenerator',
+    'exponential_request': 'ExponentialRequestGenerator',
+    'lognormal_request': 'LogNormalRequestGenerator',
+    'normal_request': 'NormalRequestGenerator',
+    'pareto_request': 'ParetoRequestGenerator',
+    'global': 'GlobalQueueHost',
+    'local': 'MultiQueueHost',
+    'shinjuku':  'ShinjukuHost',
+    'perflow': 'PerFlowQueueHost',
+    'staticcore': 'StaticCoreAllocationHost',
+    'latebinding': 'LateBindingController',
+    'leastloaded': 'LeastLoadedController',
+    'locality': 'LocalityController',
+    'leastloadedsrpt': 'LeastLoadedSRPTController',
+    'lps': 'LPSController',
+    'heterogeneousll': 'HeterogeneousLeastLoadedController',
+    'proportionalll': 'ProportionalLeastLoadedController',
+    'random': 'RandomController',
+    'powerofd': 'PowerOfDController',
+    'jiq': 'JoinIdleQueueController',
+    'simpy': 'SimpyEngine',
+    'calendar': 'CalendarEngine'
+}
+
+
+def build_parser():
+    # parser = optparse.OptionParser()
+    parser = argparse.ArgumentParser(description='')
+
+    parser.add_argument('-v', '--verbose', dest='verbose',
+                        action='count', help='Increase verbosity (specify'
+                        ' multiple times for more)', default=0)
+    parser.add_argument('-g', '--print-hist', action='store_true', dest='hist',
+                        help='Print request latency histogram', default=False)
+    parser.add_argument('-s', '--seed', dest='seed', action='store',
+                        help='Set the seed for request generator',
+                        default=100, type=int)
+    parser.add_argument('-t', '--sim_time', dest='sim_time', action='store',
+                        help='Set the simulation time', default=3600, type=int)
+    parser.add_argument('--engine', dest='engine', action='store',
+                        help='Set the event engine (simpy, calendar)',
+                        default='simpy', type=str)
+    parser.add_argument('--workload-conf', dest='work_conf', action='store',
+                        help='Configuration file for the load generation'
+                        ' functions', default="../config/work.json", type=str)
+
+    group = parser.add_argument_group('Controller and Host Options')
+    group.add_argument('--controller-type', dest='controller_type',
+                       action='store', help=('Set the controller configuration'
+                                             ' (late binding, least loaded,'
+                                             ' lps)'),
+                       default='latebinding')
+    group.add_argument('--host-type', dest='host_type', action='store',
+                       help=('Set the host configuration (global queue,'
+                             ' local queue, shinjuku, per flow queues,'
+                             ' static core allocation)'), default='global',
+                       type=str)
+    group.add_argument('--power-of-d', dest='power_of_d', action='store',
+                       help='Set the number of workers sampled per request by'
+                       ' the power-of-d controller', default=2, type=int)
+    group.add_argument('--deq-cost', dest='deq_cost', action='store',
+                       help='Set the dequeuing cost', default=0.0, type=float)
+    parser.add_argument('-c', '--cores', dest='cores', action='store',
+                        help='Set the number of cores of the system',
+                        default=8, type=int)
+    parser.add_argument('-w', '--workers', dest='workers', action='store',
+                        help='Set the number of worker hosts of the system',
+                        default=1, type=int)
+    parser.add_argument('-d', '--window', dest='window', action='store',
+                        help='Set time for simulation time start',
+                        default=0.0, type=float)
+    parser.add_argument('--capacity', dest='capacity', action='store',
+                        help=('Set the number of concurrent requests that can'
+                              ' be executing on each worker host'),
+                        default=12, type=int)
+    parser.add_argument('--latency', dest='latency', action='store',
+                        help='Set the controller-worker communication latency',
+                        default=0.0, type=float)
+
+    parser.add_argument("--steal-work", dest="steal_work", action="store_true",
+                        help="Enable host work stealing", default=False)
+    parser.add_argument("--hot", dest="steal_hot", action="store_true",
+                        help="Only steal hot work from hosts", default=False)
+    parser.add_argument("--steal-max", dest="steal_maximum", action="store",
+                        help="Maximum request a host can steal at a time",
+                        default=20, type=int)
+    parser.add_argument("--steal-timer", dest="steal_timer", action="store",
+                        help="Time interval for host work stealing",
+                        default=60, type=float)
+    parser.add_argument("--steal-threshold", dest="steal_threshold",
+                        action="store",
+                        help="Queue size threshold to warrent work stealing",
+                        default=50, type=int)
+
+    # TODO: (More general) Make more request generators??
+    # TODO: Set default costs more accurate to read papers
+    parser.add_argument("--cost-cold", dest="cost_cold", action="store",
+                        help="Cold startup time cost (milliseconds)",
+                        default=500, type=int)
+    parser.add_argument("--cost-hot", dest="cost_hot", action="store",
+                        help="Hot startup time cost (milliseconds)",
+                        default=150, type=int)
+
+    parser.add_argument("--host-queue-size", dest="queue_per_core",
+                        action="store", help="Number of queue-able requests"
+                        " in worker host per core", default=2, type=int)
+
+    group.add_argument('--queue-policy', dest='queue_policy', action='store',
+                       help=('Set the queue policy to be followed by the per'
+                             ' flow queue, ignored in any other queue'
+                             ' configuration'), default='FlowQueues', type=str)
+    parser.add_argument_group(group)
+
+    group = parser.add_argument_group('Stopping Options')
+    group.add_argument('--stop-precision', dest='stop_precision',
+                       action='store', help='Detect the end of the warmup'
+                       ' and stop once the 95%% confidence interval'
+                       ' half-width of every metric is within this fraction'
+                       ' of its estimate', default=None, type=float)
+    group.add_argument('--stop-metrics', dest='stop_metrics', action='store',
+                       help='Comma separated metrics the stopping rule waits'
+                       ' for (mean, p99)', default='mean,p99', type=str)
+    group.add_argument('--stop-batch', dest='stop_batch', action='store',
+                       help='Set the width of the batches used to detect the'
+                       ' warmup and compute confidence intervals',
+                       default=10.0, type=float)
+
+    group.add_argument('--abort-saturated', dest='abort_saturated',
+                       action='store_true', help='Abort the simulation once'
+                       ' the backlog of requests keeps growing, reporting'
+                       ' lower bounds on the latencies', default=False)
+    group.add_argument('--saturation-interval', dest='saturation_interval',
+                       action='store', help='Set the time between two'
+                       ' samples of the backlog used to detect saturation',
+                       default=10.0, type=float)
+
+    group = parser.add_argument_group('Print Options')
+    group.add_argument('--print-values', dest='print_values',
+                       action='store_true', help='Write a record for every'
+                       ' completed request to the output file', default=False)
+    group.add_argument('--output-file', dest='output_file', action='store',
+                       help='File to write the request records to, as a .npy'
+                       ' array', default=None)
+    group.add_argument('--trace-file', dest='trace_file', action='store',
+                       help='Record request events and dump them to this'
+                       ' file as a numpy array', default=None)
+    group.add_argument('--timeseries-file', dest='timeseries_file',
+                       action='store', help='Stream per-window metrics to'
+                       ' this file, as JSON lines or as binary records if it'
+                       ' ends in .bin', default=None)
+    group.add_argument('--timeseries-window', dest='timeseries_window',
+                       action='store', help='Set the width of the time-series'
+                       ' windows', default=1.0, type=float)
+    group.add_argument('--timeseries-samples', dest='timeseries_samples',
+                       action='store', help='Number of times host queues and'
+                       ' cores are sampled per window', default=10, type=int)
+    group.add_argument('--replications', dest='replications',
+                       action='store', help='Simulate the warmup up to'
+                       ' --window once and fork this many replications from'
+                       ' it, printing the results of each', default=0,
+                       type=int)
+    group.add_argument('--trace-size', dest='trace_size', action='store',
+                       help='Number of most recent events kept in the trace'
+                       ' ring buffer', default=1 << 20, type=int)
+
+    return parser
+
+
+def default_options(**kwargs):
+    # Command line defaults, with the given options replaced
+    opts = build_parser().parse_args([])
+    for key, value in kwargs.items():
+        if not hasattr(opts, key):
+            raise AttributeError('Unknown simulation option {}'.format(key))
+        setattr(opts, key, value)
+    return opts
+
+
+def build_simulation(flow_config, opts):
+    # Sets up the system and starts generating requests. Returns the
+    # environment, the histograms, the request generators and the seed
+    # sequence the flow seeds were spawned from.
+
+    # Seeding
+    if opts.seed:
+        random.seed(int(opts.seed))
+        np.random.seed(int(opts.seed))
+
+    # Every source of randomness draws from its own stream spawned from the
+    # seed: one for the arrivals and one for the service times of each flow,
+    # and one for the controller. Flow streams are spawned first and do not
+    # depend on the rest of the configuration, so runs with the same seed
+    # see the same workload whatever the controller and hosts.
+    seed_sequence = np.random.SeedSequence(opts.seed or None)
+    flow_seeds = seed_sequence.spawn(len(flow_config))
+    controller_seed = seed_sequence.spawn(1)[0]
+
+    # Request events are only recorded when asked for, either to dump them or
+    # to show them in the verbose output
+    if opts.trace_file or opts.verbose:
+        trace.enable(opts.trace_size, echo=opts.verbose > 0)
+
+    # Initialize the different components of the system
+    env = getattr(sys.modules[__name__], gen_dict[opts.engine])()
+
+    # Create a histogram per flow and a global histogram
+    histograms = Histogram(env, int(opts.sim_time), len(flow_config),
+                           float(opts.cores), flow_config, opts)
+
+    # Get the queue configuration
+    ctrl_conf = getattr(sys.modules[__name__], gen_dict[opts.controller_type])
+    sim_ctrl = ctrl_conf(env, int(opts.workers), int(opts.cores),
+                         int(opts.capacity), float(opts.latency), flow_config,
+                         histograms, opts)
+    sim_ctrl.set_rng(python_rng(controller_seed))
+
+    # TODO:Update so that it's parametrizable
+    # print "Warning: Need to update sim.py for parameterization and Testing"
+    # First list is time slice, second list is load
+    # sim_host = StaticCoreAllocationHost(env, int(opts.cores),
+    #                                     float(opts.deq_cost), [0.0, 0.0],
+    #                                     histograms, len(flow_config),
+    #                                     [0.4, 0.4])
+
+    if opts.print_values:
+        request_log.enable(opts.output_file)
+
+    if opts.timeseries_file:
+        timeseries.enable(env, sim_ctrl.workers, opts.timeseries_window,
+                          opts.timeseries_file, opts.timeseries_samples)
+
+    if opts.stop_precision:
+        metrics = opts.stop_metrics.split(',')
+        for metric in metrics:
+            if metric not in stopping.METRICS:
+                raise ValueError('Unknown stopping metric {}'.format(metric))
+        stopping.enable(env, histograms, opts.stop_batch,
+                        opts.stop_precision, metrics)
+
+    if opts.abort_saturated:
+        saturation.enable(env, histograms,
+                          int(opts.workers) * int(opts.cores),
+                          opts.saturation_interval)
+
+    multigenerator = MultipleRequestGenerator(env, sim_ctrl)
+
+    # Create one object per flow
+    for flow, flow_seed in zip(flow_config, flow_seeds):
+        params = flow
+        inter_gen = getattr(sys.modules[__name__],
+                            gen_dict[params["inter_gen"]])
+        work_gen = getattr(sys.modules[__name__],
+                           gen_dict[params["work_gen"]])
+
+        # Need to generate less load when we have shinjuku because one
+        # of the cores is just the dispatcher
+        if (opts.host_type == "shinjuku"):
+            opts.cores = int(opts.cores) - 1
+
+        multigenerator.add_generator(work_gen(histograms, env, sim_ctrl,
+                                              inter_gen,
+                                              (int(opts.workers) *
+                                               int(opts.cores)),
+                                              params,
+                                              *flow_rngs(flow_seed)))
+
+    multigenerator.begin_generation()
+
+    return env, histograms, multigenerator, seed_sequence
+
+
+def flow_rngs(flow_seed):
+    arrival_seed, service_seed = flow_seed.spawn(2)
+    return (np.random.default_rng(arrival_seed),
+            np.random.default_rng(service_seed))
+
+
+def python_rng(seed):
+    # Components drawing a single value at a time use the random module's
+    # generator, which is cheaper than numpy for scalars
+    return random.Random(int.from_bytes(seed.generate_state(4).tobytes(),
+                                        'little'))
+
+
+def finish_simulation(env, histograms, opts):
+    # Run the simulation. The results are only available if every request
+    # of the region of interest completed before the time limit.
+    try:
+        env.run(until=1000 * opts.sim_time * 2)
+    except EndException:
+        return collect_results(histograms)
+    return None
+
+
+def collect_results(histograms):
+    # Results of a run that ended with an EndException
+    if saturation.ENABLED:
+        saturation.censor(histograms)
+    results = histograms.get_info()
+    if stopping.ENABLED:
+        stopping.add_results(results)
+    if saturation.ENABLED:
+        saturation.add_results(results)
+    return results
+
+
+def close_outputs(opts):
+    # Runs whether or not the simulation succeeded, so that no output is left
+    # open and no instrumentation stays enabled for the next run in the same
+    # process
+    try:
+        if trace.ENABLED and opts.trace_file:
+            trace.dump(opts.trace_file)
+    finally:
+        if trace.ENABLED:
+            trace.disable()
+        if timeseries.ENABLED:
+            timeseries.close()
+        if request_log.ENABLED:
+            request_log.close()
+        if stopping.ENABLED:
+            stopping.disable()
+        if saturation.ENABLED:
+            saturation.disable()
+
+
+def run_simulation(flow_config, options):
+    # Returns the list of per flow results, as printed by sim.py
+
+    # Work on a copy, as some options are adjusted while building
+    opts = copy.copy(options)
+    try:
+        env, histograms, _, _ = build_simulation(flow_config, opts)
+        return finish_simulation(env, histograms, opts)
+    finally:
+        close_outputs(opts)
+
+
+def run_branch(env, histograms, multigenerator, opts, branch_seed):
+    # Give the branch its own random streams, laid out as in
+    # build_simulation, and reseed the global generators as well
+    seed = int(branch_seed.generate_state(1)[0])
+    random.seed(seed)
+    np.random.seed(seed)
+    generators = multigenerator.generators
+    for gen, flow_seed in zip(generators, branch_seed.spawn(len(generators))):
+        gen.reseed(*flow_rngs(flow_seed))
+    multigenerator.host.set_rng(python_rng(branch_seed.spawn(1)[0]))
+
+    results = finish_simulation(env, histograms, opts)
+    if results is not None:
+        for flow in results:
+            flow['shared_warmup'] = True
+    return results
+
+
+def run_replications(flow_config, options, replications, processes=None):
+    # Simulates the warmup up to the start of the window once, then forks a
+    # process per replication that continues from the warmed up state with
+    # its own random streams. Forked processes share the warmed up state
+    # copy-on-write, and at most processes of them run at a time. Returns
+    # the list of results of every replication, in order.
+    opts = copy.copy(options)
+    if opts.print_values or opts.trace_file or opts.timeseries_file:
+        raise ValueError('Replications sharing a warmup cannot write request'
+                         ' records, traces or time series')
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    try:
+        env, histograms, multigenerator, seed_sequence = build_simulation(
+            flow_config, opts)
+        if opts.window > 0:
+            try:
+                env.run(until=opts.window)
+            except EndException:
+                # The run ended before the replications branched off, so
+                # they would all give the results of the shared run
+                results = collect_results(histograms)
+                for flow in results:
+                    flow['shared_warmup'] = True
+                return [copy.deepcopy(results) for i in range(replications)]
+        return run_branches(env, histograms, multigenerator, opts,
+                            seed_sequence.spawn(replications), processes)
+    finally:
+        close_outputs(opts)
+
+
+def run_branches(env, histograms, multigenerator, opts, branch_seeds,
+                 processes):
+    results = []
+    running = collections.deque()
+    try:
+        for branch_seed in branch_seeds:
+            if len(running) == processes:
+                results.append(wait_branch(*running.popleft()))
+
+            read_fd, write_fd = os.pipe()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                try:
+                    branch_results = run_branch(env, histograms,
+                                                multigenerator, opts,
+                                                branch_seed)
+                    with os.fdopen(write_fd, 'w') as f:
+                        json.dump(branch_results, f)
+                except BaseException:
+                    traceback.print_exc()
+                    os._exit(1)
+                os._exit(0)
+            os.close(write_fd)
+            running.append((pid, read_fd))
+
+        while running:
+            results.append(wait_branch(*running.popleft()))
+    finally:
+        # When a replication failed or the parent was interrupted, stop the
+        # replications still running rather than leaving them behind
+        for pid, read_fd in running:
+            os.close(read_fd)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+    return results
+
+
+def wait_branch(pid, read_fd):
+    try:
+        with os.fdopen(read_fd) as f:
+            output = f.read()
+    finally:
+        _, status = os.waitpid(pid, 0)
+    if status != 0:
+        raise RuntimeError('Replication process {} failed'.format(pid))
+    return json.loads(output)
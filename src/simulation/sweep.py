@@ -0,0 +1,97 @@
+import os
+import multiprocessing
+
+from simulation.cache import cacheable, cache_key
+from simulation.simulation import default_options, run_simulation
+
+
+class SweepJob(object):
+    # One simulation of a sweep. Options are given as a dict of the sim.py
+    # options that differ from their defaults, and tag is left to the caller
+    # to tell the results apart (e.g. the values being swept).
+
+    def __init__(self, flow_config, options, seed, tag=None):
+        self.flow_config = flow_config
+        self.options = options
+        self.seed = seed
+        self.tag = tag
+
+    def get_options(self):
+        opts = default_options(**self.options)
+        opts.seed = self.seed
+        return opts
+
+
+def predicted_cost(job):
+    # The number of simulated requests grows with the load of each core, the
+    # number of cores in the system and the simulated time
+    opts = job.get_options()
+    load = sum(flow.get('load', 1.0) for flow in job.flow_config)
+    return load * opts.workers * opts.cores * opts.sim_time
+
+
+def run_job(args):
+    i, job = args
+    return i, run_simulation(job.flow_config, job.get_options())
+
+
+def run_sweep(jobs, processes=None, cache=None, store=None):
+    # Yields (job, results) pairs as the jobs finish. Jobs are started
+    # longest first, so that the expensive ones do not end up running alone
+    # at the end of the sweep.
+    #
+    # When a ResultCache is given, jobs found in it are yielded right away
+    # and the results of the others are added to it. When a SweepStore is
+    # given, every result is saved to it as soon as its job finishes, and
+    # jobs already in it are not run again, so that an interrupted sweep
+    # can be resumed by running it again with the same store.
+    keys = dict()
+    cached = dict()
+    pending = []
+    for job in jobs:
+        opts = job.get_options()
+        use_cache = cache is not None and cacheable(opts)
+        if not use_cache and store is None:
+            pending.append(job)
+            continue
+
+        key = cache_key(job.flow_config, opts)
+        if store is not None and key in store:
+            yield job, store[key]
+            continue
+        if use_cache and key in cache:
+            results = cache[key]
+            if store is not None:
+                store[key] = results
+            yield job, results
+            continue
+        keys[len(pending)] = key
+        cached[len(pending)] = use_cache
+        pending.append(job)
+
+    order = sorted(range(len(pending)),
+                   key=lambda i: predicted_cost(pending[i]), reverse=True)
+    for i, results in run_jobs([(i, pending[i]) for i in order], processes):
+        if cached.get(i):
+            cache[keys[i]] = results
+        if store is not None:
+            store[keys[i]] = results
+        yield pending[i], results
+
+
+def run_jobs(jobs, processes):
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(run_job, jobs):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
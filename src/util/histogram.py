@@ -1,98 +1,288 @@
 #!/usr/bin/env python3
 
 import json
+import math
 import logging
-from hdrh.histogram import HdrHistogram
+import numpy as np
+
+# Number of completions buffered before they are folded into the histograms
+BUFFER_SIZE = 1 << 12
+
 
 class EndException(Exception):
     pass
 
+
+class LogBucketHistogram(object):
+    # Log-linear histogram with the bucket layout of HdrHistogram: values
+    # are truncated to integers and every power of two range is split into
+    # enough sub-buckets for the requested significant figures. It keeps one
+    # row of counts per series and records values in vectorized batches.
+
+    def __init__(self, lowest, highest, significant_figures, rows=1):
+        self.unit_magnitude = int(math.floor(math.log(lowest) / math.log(2)))
+        largest_single_unit = 2 * math.pow(10, significant_figures)
+        sub_bucket_count_magnitude = int(math.ceil(
+            math.log(largest_single_unit) / math.log(2)))
+        self.sub_bucket_half_count_magnitude = max(
+            sub_bucket_count_magnitude - 1, 0)
+        self.sub_bucket_count = 1 << (self.sub_bucket_half_count_magnitude +
+                                      1)
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_mask = ((self.sub_bucket_count - 1) <<
+                                self.unit_magnitude)
+
+        # Number of power of two ranges needed to reach the highest value
+        bucket_count = 1
+        smallest_untrackable = self.sub_bucket_count << self.unit_magnitude
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self.counts_len = (bucket_count + 1) * self.sub_bucket_half_count
+
+        self.counts = np.zeros((rows, self.counts_len), dtype=np.int64)
+        self.max_values = np.zeros(rows)
+
+    def bucket_index(self, value):
+        pow2ceiling = (value | self.sub_bucket_mask).bit_length()
+        return (pow2ceiling - self.unit_magnitude -
+                (self.sub_bucket_half_count_magnitude + 1))
+
+    def counts_index(self, value):
+        bucket_index = self.bucket_index(value)
+        sub_bucket_index = value >> (bucket_index + self.unit_magnitude)
+        return (((bucket_index + 1) << self.sub_bucket_half_count_magnitude) +
+                sub_bucket_index - self.sub_bucket_half_count)
+
+    def counts_indexes(self, values):
+        # Vectorized counts_index over an array of integer values. frexp
+        # returns the bit length of integers as the exponent.
+        _, pow2ceiling = np.frexp((values | self.sub_bucket_mask)
+                                  .astype(np.float64))
+        bucket_index = (pow2ceiling.astype(np.int64) - self.unit_magnitude -
+                        (self.sub_bucket_half_count_magnitude + 1))
+        sub_bucket_index = values >> (bucket_index + self.unit_magnitude)
+        return (((bucket_index + 1) << self.sub_bucket_half_count_magnitude) +
+                sub_bucket_index - self.sub_bucket_half_count)
+
+    def value_from_index(self, index):
+        bucket_index = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = ((index & (self.sub_bucket_half_count - 1)) +
+                            self.sub_bucket_half_count)
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        return sub_bucket_index << (bucket_index + self.unit_magnitude)
+
+    def lowest_equivalent_value(self, value):
+        bucket_index = self.bucket_index(value)
+        sub_bucket_index = value >> (bucket_index + self.unit_magnitude)
+        return sub_bucket_index << (bucket_index + self.unit_magnitude)
+
+    def highest_equivalent_value(self, value):
+        bucket_index = self.bucket_index(value)
+        sub_bucket_index = value >> (bucket_index + self.unit_magnitude)
+        lowest = sub_bucket_index << (bucket_index + self.unit_magnitude)
+        if sub_bucket_index >= self.sub_bucket_count:
+            bucket_index += 1
+        return lowest + (1 << (self.unit_magnitude + bucket_index)) - 1
+
+    def record_value(self, value, count=1, row=0):
+        # Values out of the trackable range are ignored
+        if value < 0:
+            return
+        index = self.counts_index(int(value))
+        if index >= self.counts_len:
+            return
+        self.counts[row, index] += count
+        self.max_values[row] = max(self.max_values[row], value)
+
+    def record_values(self, values, rows=None):
+        if rows is None:
+            rows = np.zeros(len(values), dtype=np.int64)
+        keep = values >= 0
+        values = values[keep]
+        rows = rows[keep]
+        indexes = self.counts_indexes(values.astype(np.int64))
+        keep = indexes < self.counts_len
+        np.add.at(self.counts, (rows[keep], indexes[keep]), 1)
+        np.maximum.at(self.max_values, rows[keep], values[keep])
+
+    def reset(self):
+        self.counts[:] = 0
+        self.max_values[:] = 0
+
+    def get_total_count(self, row=0):
+        return int(self.counts[row].sum())
+
+    def get_max_value(self, row=0):
+        if self.max_values[row] == 0:
+            return 0
+        return self.highest_equivalent_value(int(self.max_values[row]))
+
+    def get_value_at_percentile(self, percentile, row=0):
+        cumulative = np.cumsum(self.counts[row])
+        total = int(cumulative[-1])
+        target = max(int(min(percentile, 100.0) * total / 100 + 0.5), 1)
+        if total < target:
+            return 0
+        value = self.value_from_index(int(np.searchsorted(cumulative,
+                                                          target)))
+        if percentile:
+            return self.highest_equivalent_value(value)
+        return self.lowest_equivalent_value(value)
+
+
 class Histogram(object):
 
     def __init__(self, env, time, num_histograms, cores, flow_config, opts):
-        self.histograms = [HdrHistogram(1, 60 * 60 * 1000, 2)
-                           for i in range(num_histograms)]
-        self.slowdowns = [HdrHistogram(1, 60 * 60 * 1000, 2)
-                          for i in range(num_histograms)]
-        self.global_histogram = HdrHistogram(1, 60 * 60 * 1000, 2)
+        # One row per flow
+        self.histograms = LogBucketHistogram(1, 60 * 60 * 1000, 2,
+                                             num_histograms)
+        self.slowdowns = LogBucketHistogram(1, 60 * 60 * 1000, 2,
+                                            num_histograms)
+        self.global_histogram = LogBucketHistogram(1, 60 * 60 * 1000, 2)
         self.cores = cores
         self.flow_config = flow_config
-        self.exec_time = [0 for i in range(len(flow_config))]
-        self.latency = [0 for i in range(len(flow_config))]
-        self.slowdown = [0 for i in range(len(flow_config))]
-        self.violations = [0 for i in range(len(flow_config))]
+        self.exec_time = np.zeros(len(flow_config))
+        self.latency = np.zeros(len(flow_config))
+        self.slowdown = np.zeros(len(flow_config))
+        self.violations = np.zeros(len(flow_config), dtype=np.int64)
         self.dropped = [0 for i in range(len(flow_config))]
-        self.completed = [0 for i in range(len(flow_config))]
-        self.print_values = opts.print_values
+        self.completed = np.zeros(len(flow_config), dtype=np.int64)
+        self.slos = np.array([flow.get('slo') or float('inf')
+                              for flow in flow_config])
+
+        # Completions waiting to be folded into the histograms
+        self.buffered = 0
+        self.buffer_flows = np.empty(BUFFER_SIZE, dtype=np.int64)
+        self.buffer_values = np.empty(BUFFER_SIZE)
+        self.buffer_exec_times = np.empty(BUFFER_SIZE)
         self.time = time
+        # Region of interest: the requests arriving between its start and end
+        # are measured. Its end is moved earlier when a run is stopped early.
         self.window_start = opts.window
+        self.window_end = 2 * time
+        # Runs that can end early, through the stopping rule or because they
+        # saturate, report their completions over the length of the region,
+        # so that runs ending at different times can be compared. The others
+        # divide by the simulation time.
+        self.region_throughput = bool(opts.stop_precision or
+                                      opts.abort_saturated)
         self.env = env
         self.active_requests = 0
-        if self.print_values:
-            self.print_files = [open(opts.output_file + '_flow' + str(flow),
-                                     'w+') for flow in range(len(flow_config))]
 
     def add_request(self):
         # Do not record values the region of interest
-        if self.env.now < self.window_start or self.env.now > 2 * self.time:
+        if self.env.now < self.window_start or self.env.now > self.window_end:
             return
         self.active_requests += 1
 
     def record_value(self, flow, value, exec_time, start_time):
-        if self.active_requests == 0 and self.env.now > 2 * self.time:
+        if self.active_requests == 0 and self.env.now > self.window_end:
             raise EndException
         if self.env.now > 1000 * self.time:
             raise EndException
         # Do not record values the region of interest
-        if start_time < self.window_start or start_time > 2 * self.time:
+        if start_time < self.window_start or start_time > self.window_end:
             return
 
-        self.global_histogram.record_value(1000.0 * value)
-        self.histograms[flow].record_value(1000.0 * value)
-        self.slowdowns[flow].record_value(1000.0 * value / exec_time)
-        self.latency[flow] += 1000.0 * value
-        self.slowdown[flow] += 1000.0 * value / exec_time
-        self.exec_time[flow] += exec_time
-        self.completed[flow] += 1
-        if self.flow_config[flow].get('slo'):
-            if value > self.flow_config[flow].get('slo'):
-                self.violations[flow] += 1
-        if self.print_values:
-            self.print_files[flow].write(str(value) + '\n')
+        self.buffer_value(flow, value, exec_time)
 
         # Exit if all requests within the region of interest are served
         self.active_requests -= 1
 
-    def print_info(self):
+    def buffer_value(self, flow, value, exec_time):
+        if self.buffered == BUFFER_SIZE:
+            self.flush()
+        self.buffer_flows[self.buffered] = flow
+        self.buffer_values[self.buffered] = value
+        self.buffer_exec_times[self.buffered] = exec_time
+        self.buffered += 1
+
+    def reset(self, start):
+        # Drop everything recorded so far and only record the requests that
+        # arrive from start on
+        self.histograms.reset()
+        self.slowdowns.reset()
+        self.global_histogram.reset()
+        self.exec_time[:] = 0
+        self.latency[:] = 0
+        self.slowdown[:] = 0
+        self.violations[:] = 0
+        self.dropped = [0 for i in range(len(self.flow_config))]
+        self.completed[:] = 0
+        self.buffered = 0
+        self.window_start = start
+        # Requests that arrived before start are no longer waited for
+        self.active_requests = 0
+
+    def end_region(self, end):
+        # Stop measuring the requests that arrive after end
+        self.window_end = min(end, self.window_end)
+
+    def flush(self):
+        # Fold the buffered completions into the histograms and totals
+        n = self.buffered
+        flows = self.buffer_flows[:n]
+        values = self.buffer_values[:n]
+        latencies = 1000.0 * values
+        slowdowns = latencies / self.buffer_exec_times[:n]
+        num_flows = len(self.flow_config)
+
+        self.global_histogram.record_values(latencies)
+        self.histograms.record_values(latencies, flows)
+        self.slowdowns.record_values(slowdowns, flows)
+        self.latency += np.bincount(flows, latencies, num_flows)
+        self.slowdown += np.bincount(flows, slowdowns, num_flows)
+        self.exec_time += np.bincount(flows, self.buffer_exec_times[:n],
+                                      num_flows)
+        self.completed += np.bincount(flows, minlength=num_flows)
+        self.violations += np.bincount(flows[values > self.slos[flows]],
+                                       minlength=num_flows)
+        self.buffered = 0
+
+    def get_info(self):
+        self.flush()
         info = []
-        for i in range(len(self.histograms)):
+        for i in range(len(self.flow_config)):
             # Add the dropped requests as max time
-            max_value = self.histograms[i].get_max_value()
-            for j in range(self.dropped[i]):
-                self.histograms[i].record_value(max_value)
+            max_value = self.histograms.get_max_value(i)
+            if self.dropped[i]:
+                self.histograms.record_value(max_value, self.dropped[i], i)
 
             # Get the total count of received requests
-            total_count = self.histograms[i].get_total_count()
+            total_count = self.histograms.get_total_count(i)
 
             # Get the 50%-90%-99% latency
-            latency50 = self.histograms[i].get_value_at_percentile(50)
-            latency90 = self.histograms[i].get_value_at_percentile(90)
-            latency99 = self.histograms[i].get_value_at_percentile(99)
+            latency50 = self.histograms.get_value_at_percentile(50, i)
+            latency90 = self.histograms.get_value_at_percentile(90, i)
+            latency99 = self.histograms.get_value_at_percentile(99, i)
 
             # Get average latency
-            latency_avg = self.latency[i] / total_count if total_count > 0 else 0.0
+            latency_avg = (float(self.latency[i]) / total_count
+                           if total_count > 0 else 0.0)
 
             # Get the 50%-90%-99% slowdown
-            slowdown50 = self.slowdowns[i].get_value_at_percentile(50)
-            slowdown90 = self.slowdowns[i].get_value_at_percentile(90)
-            slowdown99 = self.slowdowns[i].get_value_at_percentile(99)
+            slowdown50 = self.slowdowns.get_value_at_percentile(50, i)
+            slowdown90 = self.slowdowns.get_value_at_percentile(90, i)
+            slowdown99 = self.slowdowns.get_value_at_percentile(99, i)
 
             # Get average slowdown
-            slowdown_avg = self.slowdown[i] / total_count if total_count > 0 else 0.0
+            slowdown_avg = (float(self.slowdown[i]) / total_count
+                            if total_count > 0 else 0.0)
+
+            if self.region_throughput:
+                measured_time = self.window_end - self.window_start
+            else:
+                measured_time = self.time
+            throughput = (float(self.completed[i]) / measured_time
+                          if measured_time > 0 else 0.0)
 
             # Prepare the json for output
             new_value = {
-                'avg_exec_time': (1.0 * self.exec_time[i] / total_count) if total_count > 0 else 0.0,
+                'avg_exec_time': (float(self.exec_time[i]) / total_count
+                                  if total_count > 0 else 0.0),
                 'latency50': latency50 / 1000.0,
                 'latency90': latency90 / 1000.0,
                 'latency99': latency99 / 1000.0,
@@ -101,14 +291,18 @@ class Histogram(object):
                 'slowdown90': slowdown90 / 1000.0,
                 'slowdown99': slowdown99 / 1000.0,
                 'slowdown_avg': slowdown_avg / 1000.0,
-                'total_throughput': 1.0 * self.completed[i] / self.time,
-                'total_completed': self.completed[i],
-                'slo_success': 1.0 - (1.0 * self.violations[i] / total_count) if total_count > 0 else 0.0,
+                'total_throughput': throughput,
+                'total_completed': int(self.completed[i]),
+                'slo_success': (1.0 - float(self.violations[i]) / total_count
+                                if total_count > 0 else 0.0),
                 'dropped_requests': self.dropped[i]
             }
             info.append(new_value)
         logging.debug('Active requests %d' % (self.active_requests))
-        print(json.dumps(info))
+        return info
+
+    def print_info(self):
+        print(json.dumps(self.get_info()))
 
     def drop_request(self, flow_id):
         self.dropped[flow_id] += 1
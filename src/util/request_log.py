@@ -0,0 +1,84 @@
+import struct
+import numpy as np
+
+# Call sites check this flag before recording anything, so a disabled log
+# costs a single attribute lookup per completed request
+ENABLED = False
+
+# One record per completed request. Times are in seconds; arrival is when the
+# request was generated, dispatch when it reached its worker and start when
+# it first ran on a core.
+RECORD_DTYPE = np.dtype([('idx', 'i8'), ('flow_id', 'i4'), ('worker', 'i4'),
+                         ('core', 'i4'), ('cold', '?'), ('arrival', 'f8'),
+                         ('dispatch', 'f8'), ('start', 'f8'),
+                         ('finish', 'f8'), ('exec_time', 'f8')])
+
+# Records buffered before they are appended to the file
+CHUNK_SIZE = 1 << 16
+
+# Fixed size of the .npy header, so that the record count can be filled in
+# once the run is over without moving the records
+HEADER_SIZE = 256
+
+log = None
+
+
+def npy_header(count):
+    header = repr({'descr': np.lib.format.dtype_to_descr(RECORD_DTYPE),
+                   'fortran_order': False, 'shape': (count,)})
+    header = header.ljust(HEADER_SIZE - 11) + '\n'
+    return (np.lib.format.magic(1, 0) + struct.pack('<H', len(header)) +
+            header.encode('latin1'))
+
+
+class RequestLog(object):
+    # Writes completed requests as fixed-width records to a .npy file, which
+    # can be loaded or memory-mapped with np.load without any parsing
+
+    def __init__(self, filename, chunk_size=CHUNK_SIZE):
+        self.output = open(filename, 'wb')
+        self.output.write(npy_header(0))
+        self.buffer = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        self.buffered = 0
+        self.count = 0
+
+    def record(self, request, worker, core, finish):
+        if self.buffered == len(self.buffer):
+            self.flush()
+        self.buffer[self.buffered] = (request.idx, request.flow_id, worker,
+                                      core, request.cold_start,
+                                      request.start_time,
+                                      request.dispatch_time,
+                                      request.run_start_time, finish,
+                                      request.total_time)
+        self.buffered += 1
+
+    def flush(self):
+        self.buffer[:self.buffered].tofile(self.output)
+        self.count += self.buffered
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.output.seek(0)
+        self.output.write(npy_header(self.count))
+        self.output.close()
+
+
+def enable(filename):
+    global ENABLED, log
+    log = RequestLog(filename)
+    ENABLED = True
+
+
+def record(request, worker, core, finish):
+    log.record(request, worker, core, finish)
+
+
+def close():
+    global ENABLED, log
+    try:
+        log.close()
+    finally:
+        ENABLED = False
+        log = None
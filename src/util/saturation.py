@@ -0,0 +1,139 @@
+import collections
+import numpy as np
+
+from util.histogram import EndException
+
+# Call sites check this flag before recording anything, so a disabled
+# detector costs a single attribute lookup per request
+ENABLED = False
+
+# The backlog has to grow over the last half of the run, and over at least
+# this many samples, split into this many batches
+MIN_HORIZON_SAMPLES = 200
+BATCHES = 10
+
+# Factor by which the mean backlog of every batch has to exceed that of the
+# batch before it
+GROWTH = 1.02
+
+# Requests in the system per core below which a growing backlog is not
+# considered a sign of saturation
+MIN_BACKLOG = 2.0
+
+detector = None
+
+
+class SaturationDetector(object):
+    # Keeps track of the requests in the system, queued at the controller
+    # or the hosts or running, and samples their number per core of the
+    # system until the region of interest ends. A system that cannot keep up
+    # has a backlog that grows without bound: once the mean backlog has grown
+    # from each batch to the next over the last half of the run, and over no
+    # less than a long horizon, the simulation is aborted. Shorter horizons
+    # take the long excursions of stable systems with heavy tailed execution
+    # times for saturation.
+    #
+    # The backlog is counted in requests rather than in queued work. A few
+    # requests longer than the whole run, each running on a single core,
+    # make the queued work of such a stable system climb for most of it.
+
+    def __init__(self, env, histograms, num_cores, interval):
+        self.env = env
+        self.histograms = histograms
+        self.num_cores = num_cores
+        self.interval = interval
+        # Insertion ordered dict used as a set of requests in the system
+        self.outstanding = dict()
+        # Running totals of the samples, so that batch means cost the same
+        # however long the horizon
+        self.totals = [0.0]
+        self.saturated_at = None
+        self.censored = collections.Counter()
+
+        self.env.process(self.run())
+
+    def record_arrival(self, request):
+        self.outstanding[request] = None
+
+    def record_departure(self, request):
+        self.outstanding.pop(request, None)
+
+    def run(self):
+        # Once the region of interest is over the run only waits for its
+        # last requests, which a stable system keeps serving
+        while True:
+            yield self.env.timeout(self.interval)
+            if self.env.now > self.histograms.window_end:
+                return
+            backlog = 1.0 * len(self.outstanding) / self.num_cores
+            self.totals.append(self.totals[-1] + backlog)
+            if self.growing():
+                self.saturated_at = self.env.now
+                raise EndException
+
+    def growing(self):
+        n = len(self.totals) - 1
+        size = max(MIN_HORIZON_SAMPLES, n // 2) // BATCHES
+        if n < size * BATCHES:
+            return False
+        totals = np.array([self.totals[i] for i in
+                           range(n - size * BATCHES, n + 1, size)])
+        means = np.diff(totals) / size
+        return (means[-1] >= MIN_BACKLOG and
+                (means[1:] >= GROWTH * means[:-1]).all())
+
+    def censor(self, histograms):
+        # The requests still in the system have been waiting at least since
+        # they arrived, so recording their age gives lower bounds on the
+        # latencies of a saturated run
+        if self.saturated_at is None:
+            return
+        for request in self.outstanding:
+            if (histograms.window_start <= request.start_time <=
+                    histograms.window_end):
+                histograms.buffer_value(request.flow_id,
+                                        self.env.now - request.start_time,
+                                        request.total_time)
+                self.censored[request.flow_id] += 1
+        # They are not completed requests though. The region of interest
+        # ends with the run, as when the stopping rule ends it, so that the
+        # throughput is measured as in the other runs.
+        histograms.flush()
+        histograms.end_region(self.env.now)
+        for flow, count in self.censored.items():
+            histograms.completed[flow] -= count
+
+    def add_results(self, results):
+        for flow, info in enumerate(results):
+            info['saturated'] = self.saturated_at is not None
+            if self.saturated_at is not None:
+                info['saturated_at'] = self.saturated_at
+                info['censored_requests'] = self.censored[flow]
+
+
+def enable(env, histograms, num_cores, interval):
+    global ENABLED, detector
+    detector = SaturationDetector(env, histograms, num_cores, interval)
+    ENABLED = True
+
+
+def record_arrival(request):
+    detector.record_arrival(request)
+
+
+def record_departure(request):
+    detector.record_departure(request)
+
+
+def censor(histograms):
+    detector.censor(histograms)
+
+
+def add_results(results):
+    detector.add_results(results)
+
+
+def disable():
+    global ENABLED, detector
+    ENABLED = False
+    detector = None
@@ -0,0 +1,165 @@
+import numpy as np
+
+from util.histogram import LogBucketHistogram, EndException
+
+ENABLED = False
+
+# Batches needed before the warmup can be truncated, and batches of steady
+# state needed before the confidence intervals are trusted
+MIN_BATCHES = 10
+
+# Two-sided 95% quantiles of Student's t distribution for 1 to 30 degrees
+# of freedom, the normal quantile is used past that
+T_QUANTILES = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306,
+               2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110,
+               2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056,
+               2.052, 2.048, 2.045, 2.042]
+
+METRICS = ['mean', 'p99']
+
+rule = None
+
+
+def t_quantile(df):
+    if df <= len(T_QUANTILES):
+        return T_QUANTILES[df - 1]
+    return 1.96
+
+
+def mser_truncation(means):
+    # MSER: the truncation point minimizing the squared standard error of
+    # the mean of the remaining batches
+    means = np.asarray(means)
+    best, best_d = None, 0
+    for d in range(len(means) - 1):
+        rest = means[d:]
+        statistic = ((rest - rest.mean()) ** 2).sum() / len(rest) ** 2
+        if best is None or statistic < best:
+            best, best_d = statistic, d
+    return best_d
+
+
+def half_width(values):
+    # Half-width of the batch means confidence interval
+    values = np.asarray(values)
+    return (t_quantile(len(values) - 1) * values.std(ddof=1) /
+            np.sqrt(len(values)))
+
+
+class StoppingRule(object):
+    # Ends the simulation once the results are precise enough. Completions
+    # are grouped in batches of simulated time, read from the histograms.
+    # The warmup is over once MSER truncates the batch mean latencies in
+    # their first half; the histograms then restart from that point, and the
+    # region of interest ends when the batch means confidence interval of
+    # every requested metric of every flow is within precision of its
+    # estimate.
+
+    def __init__(self, env, histograms, width, precision, metrics):
+        self.env = env
+        self.histograms = histograms
+        self.width = width
+        self.precision = precision
+        self.metrics = metrics
+        num_flows = len(histograms.flow_config)
+
+        self.warmup_end = None
+        self.warmup_means = []
+        self.batches = dict((metric, [[] for i in range(num_flows)])
+                            for metric in metrics)
+        self.half_widths = dict((metric, [None] * num_flows)
+                                for metric in metrics)
+        self.converged = False
+
+        self.completed = np.zeros(num_flows, dtype=np.int64)
+        self.latency = np.zeros(num_flows)
+        self.counts = np.zeros_like(histograms.histograms.counts)
+        self.batch = LogBucketHistogram(1, 60 * 60 * 1000, 2, num_flows)
+
+        self.env.process(self.run())
+
+    def run(self):
+        while not self.converged:
+            yield self.env.timeout(self.width)
+            self.close_batch()
+
+    def close_batch(self):
+        hist = self.histograms
+        hist.flush()
+        completed = hist.completed - self.completed
+        latency = hist.latency - self.latency
+        self.batch.counts[:] = hist.histograms.counts - self.counts
+        self.completed = hist.completed.copy()
+        self.latency = hist.latency.copy()
+        self.counts = hist.histograms.counts.copy()
+
+        if self.warmup_end is None:
+            if completed.sum() == 0:
+                return
+            self.warmup_means.append(latency.sum() / completed.sum())
+            n = len(self.warmup_means)
+            if (n >= MIN_BATCHES and
+                    mser_truncation(self.warmup_means) < n // 2):
+                self.end_warmup()
+            return
+
+        for flow in range(len(completed)):
+            if completed[flow] == 0:
+                continue
+            if 'mean' in self.batches:
+                self.batches['mean'][flow].append(latency[flow] /
+                                                  completed[flow])
+            if 'p99' in self.batches:
+                self.batches['p99'][flow].append(
+                    self.batch.get_value_at_percentile(99, flow))
+
+        self.converged = True
+        for metric, flows in self.batches.items():
+            for flow, values in enumerate(flows):
+                if len(values) < MIN_BATCHES:
+                    self.converged = False
+                    continue
+                self.half_widths[metric][flow] = half_width(values) / 1000.0
+                estimate = np.mean(values) / 1000.0
+                if self.half_widths[metric][flow] > self.precision * estimate:
+                    self.converged = False
+
+        if self.converged:
+            # End the region of interest here. As at the end of a full run,
+            # the requests that arrived in it are waited for, so that neither
+            # the throughput nor the latencies leave out the slow ones.
+            hist.end_region(self.env.now)
+            if hist.active_requests == 0:
+                raise EndException
+
+    def end_warmup(self):
+        self.warmup_end = self.env.now
+        self.histograms.reset(self.warmup_end)
+        self.completed[:] = 0
+        self.latency[:] = 0
+        self.counts[:] = 0
+
+    def add_results(self, results):
+        for flow, info in enumerate(results):
+            info['warmup_end'] = self.warmup_end
+            info['converged'] = self.converged
+            if 'mean' in self.half_widths:
+                info['latency_avg_ci'] = self.half_widths['mean'][flow]
+            if 'p99' in self.half_widths:
+                info['latency99_ci'] = self.half_widths['p99'][flow]
+
+
+def enable(env, histograms, width, precision, metrics):
+    global ENABLED, rule
+    rule = StoppingRule(env, histograms, width, precision, metrics)
+    ENABLED = True
+
+
+def add_results(results):
+    rule.add_results(results)
+
+
+def disable():
+    global ENABLED, rule
+    ENABLED = False
+    rule = None
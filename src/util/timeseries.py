@@ -0,0 +1,126 @@
+import json
+import numpy as np
+
+from util.histogram import LogBucketHistogram, BUFFER_SIZE
+
+# Call sites check this flag before recording anything, so a disabled
+# recorder costs a single attribute lookup per event
+ENABLED = False
+
+# Record layout of binary output files, one record per window. Latencies are
+# in seconds, queue length is the mean per host and active cores the mean
+# over the whole system.
+WINDOW_DTYPE = np.dtype([('start', 'f8'), ('end', 'f8'), ('completed', 'i8'),
+                         ('throughput', 'f8'), ('latency50', 'f8'),
+                         ('latency99', 'f8'), ('cold_starts', 'i8'),
+                         ('queue_length', 'f8'), ('active_cores', 'f8')])
+
+recorder = None
+
+
+class TimeSeries(object):
+    # Aggregates metrics over consecutive windows of simulated time and
+    # writes each window out as soon as it closes. Only the open window is
+    # kept in memory, and its state is reset for the next one.
+
+    def __init__(self, env, hosts, width, filename, samples):
+        self.env = env
+        self.hosts = hosts
+        self.width = width
+        self.samples = samples
+        self.binary = filename.endswith('.bin')
+        self.output = open(filename, 'wb' if self.binary else 'w')
+
+        self.start = float(env.now)
+        self.completed = 0
+        self.cold_starts = 0
+        self.latencies = LogBucketHistogram(1, 60 * 60 * 1000, 2)
+        self.buffered = 0
+        self.buffer = np.empty(BUFFER_SIZE)
+        # Host queue lengths and active cores are sampled during the window
+        self.queue_length = 0
+        self.active_cores = 0
+        self.num_samples = 0
+
+        self.env.process(self.run())
+
+    def record_completion(self, latency):
+        if self.buffered == BUFFER_SIZE:
+            self.latencies.record_values(self.buffer)
+            self.buffered = 0
+        self.buffer[self.buffered] = 1000.0 * latency
+        self.buffered += 1
+        self.completed += 1
+
+    def record_cold_start(self):
+        self.cold_starts += 1
+
+    def sample(self):
+        for host in self.hosts:
+            self.queue_length += len(host.queue)
+            self.active_cores += len(host.core_group.active_cores)
+        self.num_samples += 1
+
+    def run(self):
+        while True:
+            for i in range(self.samples):
+                yield self.env.timeout(1.0 * self.width / self.samples)
+                self.sample()
+            self.close_window()
+
+    def close_window(self):
+        self.latencies.record_values(self.buffer[:self.buffered])
+        end = self.env.now
+        num_samples = max(self.num_samples, 1)
+        window = (self.start, end, self.completed,
+                  self.completed / (end - self.start) if end > self.start
+                  else 0.0,
+                  self.latencies.get_value_at_percentile(50) / 1000.0,
+                  self.latencies.get_value_at_percentile(99) / 1000.0,
+                  self.cold_starts,
+                  1.0 * self.queue_length / num_samples / len(self.hosts),
+                  1.0 * self.active_cores / num_samples)
+        if self.binary:
+            np.array([window], dtype=WINDOW_DTYPE).tofile(self.output)
+        else:
+            self.output.write(json.dumps(dict(zip(WINDOW_DTYPE.names,
+                                                  window))) + '\n')
+
+        # Recycle the window state
+        self.start = end
+        self.completed = 0
+        self.cold_starts = 0
+        self.latencies.reset()
+        self.buffered = 0
+        self.queue_length = 0
+        self.active_cores = 0
+        self.num_samples = 0
+
+    def close(self):
+        # Write out the window cut short by the end of the simulation
+        if self.env.now > self.start:
+            self.close_window()
+        self.output.close()
+
+
+def enable(env, hosts, width, filename, samples):
+    global ENABLED, recorder
+    recorder = TimeSeries(env, hosts, width, filename, samples)
+    ENABLED = True
+
+
+def record_completion(latency):
+    recorder.record_completion(latency)
+
+
+def record_cold_start():
+    recorder.record_cold_start()
+
+
+def close():
+    global ENABLED, recorder
+    try:
+        recorder.close()
+    finally:
+        ENABLED = False
+        recorder = None
@@ -0,0 +1,79 @@
+import logging
+import numpy as np
+
+# Call sites check this flag before recording anything, so a disabled
+# tracer costs a single attribute lookup per event
+ENABLED = False
+
+ARRIVE = 0
+ENQUEUE = 1
+DISPATCH = 2
+START = 3
+COLD_START = 4
+HOT_START = 5
+PREEMPT = 6
+STEAL = 7
+COMPLETE = 8
+
+EVENT_NAMES = ['arrive', 'enqueue', 'dispatch', 'start', 'cold_start',
+               'hot_start', 'preempt', 'steal', 'complete']
+
+# For STEAL events the core column holds the worker the request was stolen
+# from. Fields that do not apply to an event are set to -1.
+TRACE_DTYPE = np.dtype([('time', 'f8'), ('event', 'u1'), ('idx', 'i8'),
+                        ('flow', 'i4'), ('worker', 'i4'), ('core', 'i4')])
+
+tracer = None
+
+
+class Tracer(object):
+
+    def __init__(self, capacity, echo=False):
+        self.buffer = np.zeros(capacity, dtype=TRACE_DTYPE)
+        self.capacity = capacity
+        self.count = 0
+        self.echo = echo
+
+    def record(self, event, time, request, worker, core):
+        self.buffer[self.count % self.capacity] = (time, event, request.idx,
+                                                   request.flow_id, worker,
+                                                   core)
+        self.count += 1
+        if self.echo:
+            logging.info('Trace: %s request %d from flow %d worker %d'
+                         ' core %d at %f', EVENT_NAMES[event], request.idx,
+                         request.flow_id, worker, core, time)
+
+    def events(self):
+        # Return the buffered events in the order they were recorded
+        if self.count <= self.capacity:
+            return self.buffer[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((self.buffer[start:], self.buffer[:start]))
+
+    def dump(self, filename):
+        with open(filename, 'wb') as f:
+            np.save(f, self.events())
+        if self.count > self.capacity:
+            logging.warning('Trace: ring buffer overflowed, dropped %d oldest'
+                            ' events', self.count - self.capacity)
+
+
+def enable(capacity, echo=False):
+    global ENABLED, tracer
+    tracer = Tracer(capacity, echo)
+    ENABLED = True
+
+
+def disable():
+    global ENABLED, tracer
+    ENABLED = False
+    tracer = None
+
+
+def record(event, time, request, worker=-1, core=-1):
+    tracer.record(event, time, request, worker, core)
+
+
+def dump(filename):
+    tracer.dump(filename)
@@ -0,0 +1,25 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The simulator is run from src, where its packages are importable
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+
+
+@pytest.fixture
+def simulate(tmp_path):
+    # Runs the simulator from the command line and returns its results. The
+    # simulator keeps state across runs, so each one gets its own process.
+    def run(flows, args, command=('sim.py',)):
+        conf = tmp_path / 'flows.json'
+        conf.write_text(json.dumps(flows))
+        output = subprocess.check_output(
+            [sys.executable] + list(command) +
+            ['--workload-conf', str(conf)] + [str(arg) for arg in args],
+            cwd=SRC)
+        return json.loads(output)
+    return run
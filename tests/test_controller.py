@@ -0,0 +1,118 @@
+import argparse
+import random
+
+import pytest
+
+from controller.controller import PowerOfDController, JoinIdleQueueController
+from engine.engine import SimpyEngine
+from request.request import Request
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+
+# Runs the simulator with requests dispatched as the controllers used to,
+# through a process per hop
+PROCESS_DISPATCH = '''
+from controller.controller import Controller
+
+
+def process_dispatch(self, request, worker_idx):
+    def hop():
+        yield self.env.timeout(self.latency)
+        self.assign_to_worker(request, worker_idx)
+    self.env.process(hop())
+
+
+Controller.dispatch = process_dispatch
+
+import sim
+sim.main()
+'''
+
+
+@pytest.mark.parametrize('args', [
+    ['--controller-type', 'latebinding', '--capacity', 2],
+    ['--controller-type', 'latebinding', '--capacity', 2, '--latency', 0.01],
+    ['--controller-type', 'leastloaded'],
+    ['--controller-type', 'leastloaded', '--latency', 0.01],
+    ['--controller-type', 'random', '--latency', 0.01],
+])
+def test_dispatch_keeps_the_results(simulate, args):
+    args = ['-s', 1, '-t', 20, '-c', 4, '-w', 3] + args
+    results = simulate([FLOW], args)
+    assert results[0]['total_completed'] > 0
+    assert results == simulate([FLOW], args,
+                               command=('-c', PROCESS_DISPATCH))
+
+
+FLOW_CONFIG = [{'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}]
+
+
+def make_controller(controller_type, num_workers, num_cores, capacity,
+                    **options):
+    # The command line defaults of the options the controllers and hosts read
+    opts = argparse.Namespace(cost_cold=500, cost_hot=150, power_of_d=2,
+                              queue_per_core=2, queue_policy='FlowQueues',
+                              steal_work=False, steal_hot=False,
+                              steal_maximum=20, steal_timer=60,
+                              steal_threshold=50, print_values=False,
+                              window=0.0)
+    vars(opts).update(options)
+    controller = controller_type(SimpyEngine(), num_workers, num_cores,
+                                 capacity, 0.0, FLOW_CONFIG, None, opts)
+    controller.set_rng(random.Random(3))
+    # Record the decisions instead of running the requests
+    controller.dispatched = []
+    controller.dispatch = lambda request, worker_idx: (
+        controller.dispatched.append((request, worker_idx)))
+    return controller
+
+
+def requests(count):
+    return [Request(idx, 1.0, 0.0, 0, 1.0) for idx in range(count)]
+
+
+def test_power_of_all_workers_picks_a_least_loaded_one():
+    controller = make_controller(PowerOfDController, 5, 4, 3, power_of_d=5)
+    rng = random.Random(4)
+    for request in requests(200):
+        loads = list(controller.worker_loads)
+        if min(loads) == 3 or (max(loads) > 0 and rng.random() < 0.4):
+            worker_idx = rng.choice([i for i, load in enumerate(loads)
+                                     if load > 0])
+            controller.receive_completion(None, worker_idx)
+            continue
+        controller.receive_request(request)
+        _, worker_idx = controller.dispatched[-1]
+        assert loads[worker_idx] == min(loads)
+
+
+def test_power_of_d_queues_when_the_sampled_workers_are_full():
+    controller = make_controller(PowerOfDController, 2, 1, 1, power_of_d=2)
+    first, second, third = requests(3)
+    for request in (first, second, third):
+        controller.receive_request(request)
+    assert sorted(worker for _, worker in controller.dispatched) == [0, 1]
+    assert len(controller.queue) == 1
+    # The queued request goes to the first worker to complete one
+    controller.receive_completion(first, 1)
+    assert controller.dispatched[-1] == (third, 1)
+    assert controller.worker_loads == [1, 1]
+
+
+def test_join_idle_queue():
+    controller = make_controller(JoinIdleQueueController, 3, 2, 2)
+    for request in requests(6):
+        controller.receive_request(request)
+    # Idle cores are taken round-robin across workers
+    assert [worker for _, worker in controller.dispatched] == [0, 1, 2, 0, 1,
+                                                               2]
+    # Without idle workers requests go to a random worker
+    controller.receive_request(Request(6, 1.0, 0.0, 0, 1.0))
+    assert controller.worker_loads[controller.dispatched[-1][1]] == 3
+    # A worker with a free core rejoins the idle queue
+    controller.receive_completion(None, 1)
+    controller.receive_completion(None, 1)
+    controller.receive_request(Request(7, 1.0, 0.0, 0, 1.0))
+    assert controller.dispatched[-1][1] == 1
@@ -0,0 +1,50 @@
+import random
+
+from host.host import CoreGroup
+
+
+class ListCoreGroup(object):
+    # The list based implementation CoreGroup replaced
+
+    def __init__(self):
+        self.idle_cores = []
+        self.active_cores = []
+
+    def one_idle_core_become_active(self):
+        if len(self.idle_cores) == 0:
+            return None
+        core = self.idle_cores.pop(0)
+        self.active_cores.append(core)
+        return core
+
+    def core_become_idle(self, core):
+        self.active_cores.remove(core)
+        self.idle_cores.append(core)
+
+
+class Core(object):
+
+    def __init__(self, core_id):
+        self.core_id = core_id
+
+
+def test_core_group_matches_the_list_implementation():
+    rng = random.Random(5)
+    group, reference = CoreGroup(), ListCoreGroup()
+    for i in range(8):
+        core = Core(i)
+        group.append_idle_core(core)
+        reference.idle_cores.append(core)
+
+    for step in range(5000):
+        if reference.active_cores and rng.random() < 0.5:
+            core = rng.choice(reference.active_cores)
+            group.core_become_idle(core)
+            reference.core_become_idle(core)
+        else:
+            assert (group.one_idle_core_become_active() is
+                    reference.one_idle_core_become_active())
+        assert group.available() == bool(reference.idle_cores)
+        assert list(group.idle_cores) == reference.idle_cores
+        # SRPT preemption picks its victim by position among active cores
+        assert list(group.active_cores) == reference.active_cores
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from engine.engine import SimpyEngine
+from queues.dequeue_policy import (LongestLengthDequeuePolicy,
+                                   LongestLoadDequeuePolicy,
+                                   FirstPacketLatencyDequeuePolicy,
+                                   FirstPacketWaitDequeuePolicy,
+                                   RoundRobinDequeuePolicy)
+from queues.request_queue import (PerFlowRequestQueue,
+                                  PerFlowRequestQueueGroup)
+from request.request import Request
+
+
+class Clock(SimpyEngine):
+
+    def advance(self, delay):
+        self._now += delay
+
+
+# The linear scans the indexed policies replaced, ties go to the highest
+# flow index
+def scan(queues, key):
+    max_value = 0
+    max_index = 0
+    for flow in range(len(queues)):
+        if key(queues[flow]) >= max_value:
+            max_index = flow
+            max_value = key(queues[flow])
+    return max_index
+
+
+SCANS = {
+    LongestLengthDequeuePolicy: lambda q: q.expected_length,
+    LongestLoadDequeuePolicy: lambda q: q.get_load(),
+    FirstPacketLatencyDequeuePolicy: lambda q: q.get_first_packet_latency(),
+    FirstPacketWaitDequeuePolicy: lambda q: q.get_first_packet_wait(),
+}
+
+
+def queue_group(env, slos):
+    flow_config = [{'slo': slo, 'enq_front': False} for slo in slos]
+    group = PerFlowRequestQueueGroup(env, 0.0, flow_config)
+    for flow in flow_config:
+        group.add_queue(PerFlowRequestQueue(env, -1, 0.8, 4, flow))
+    return group
+
+
+def random_request(rng, env, idx, num_flows):
+    # Few distinct values, so that ties are common
+    exec_time = rng.choice([1.0, 2.0, 4.0])
+    return Request(idx, exec_time, env.now, rng.randrange(num_flows),
+                   exec_time)
+
+
+@pytest.mark.parametrize('policy', sorted(SCANS, key=lambda p: p.__name__))
+def test_indexed_policies_match_the_linear_scans(policy):
+    rng = random.Random(17)
+    env = Clock()
+    slos = [rng.choice([10.0, 20.0, 50.0]) for flow in range(7)]
+    group = queue_group(env, slos)
+    group.set_dequeue_policy(policy(env, group))
+
+    for idx in range(4000):
+        env.advance(rng.choice([0.0, 0.0, 0.5, 1.0]))
+        action = rng.random()
+        if action < 0.45:
+            group.enqueue(random_request(rng, env, idx, len(slos)))
+        elif not group.empty():
+            expected = scan(group.qs, SCANS[policy])
+            request = group.dequeue()
+            assert request.flow_id == expected
+            if action < 0.55:
+                # A preempted request goes back to its flow queue
+                group.renqueue(request)
+
+
+def test_round_robin_serves_active_flows_in_turn():
+    rng = random.Random(19)
+    env = Clock()
+    group = queue_group(env, [10.0] * 5)
+    group.set_dequeue_policy(RoundRobinDequeuePolicy(env, group))
+
+    # Flows join the ring in the order they get requests, and leave it once
+    # they run out
+    served = []
+    for idx, flow in enumerate([3, 1, 3, 4, 1, 3]):
+        group.enqueue(Request(idx, 1.0, 0.0, flow, 1.0))
+    while not group.empty():
+        served.append(group.dequeue().flow_id)
+    assert served == [3, 1, 4, 3, 1, 3]
+
+    for idx in range(2000):
+        if rng.random() < 0.5:
+            group.enqueue(random_request(rng, env, idx, 5))
+        elif not group.empty():
+            ring = list(group.dequeue_policy.ring)
+            assert all(not group[flow].empty() for flow in ring)
+            assert sorted(ring) == [flow for flow in range(5)
+                                    if not group[flow].empty()]
+            assert group.dequeue().flow_id == ring[0]
@@ -0,0 +1,62 @@
+import pytest
+
+from engine.engine import SimpyEngine
+from engine.event_calendar import CalendarEngine
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+
+
+def event_log(env):
+    # Processes waking up at the same times, sharing a resource and
+    # scheduling callbacks, logged in the order they run
+    log = []
+    resource = env.resource(capacity=2)
+
+    def worker(name, delay, hold):
+        yield env.timeout(delay)
+        request = resource.request()
+        yield request
+        log.append((env.now, name, 'acquired'))
+        yield env.timeout(hold)
+        resource.release(request)
+        log.append((env.now, name, 'released'))
+
+    def waiter(event):
+        value = yield event
+        log.append((env.now, 'waiter', value))
+
+    for i in range(5):
+        env.process(worker(i, i % 2, 3 - i % 3))
+    event = env.event()
+    env.process(waiter(event))
+    env.call_later(2, lambda: event.succeed('woken'))
+    env.call_at(2, lambda: log.append((env.now, 'callback', None)))
+    env.run(until=20)
+    return log
+
+
+def test_calendar_engine_orders_events_as_simpy():
+    assert event_log(CalendarEngine()) == event_log(SimpyEngine())
+
+
+def test_calendar_engine_rejects_past_until():
+    env = CalendarEngine()
+    env.run(until=5)
+    with pytest.raises(ValueError):
+        env.run(until=5)
+
+
+@pytest.mark.parametrize('args', [
+    ['--controller-type', 'latebinding'],
+    ['--controller-type', 'leastloaded', '--latency', 0.01],
+    ['--controller-type', 'leastloadedsrpt'],
+    ['--controller-type', 'random', '--host-type', 'local'],
+])
+def test_engines_give_identical_results(simulate, args):
+    args = ['-s', 1, '-t', 100, '-c', 4, '-w', 2] + args
+    results = [simulate([FLOW], args + ['--engine', engine])
+               for engine in ('simpy', 'calendar')]
+    assert results[0][0]['total_completed'] > 0
+    assert results[0] == results[1]
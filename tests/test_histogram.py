@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from util.histogram import LogBucketHistogram
+
+PERCENTILES = [0, 1, 25, 50, 90, 99, 99.9, 99.99, 100]
+
+
+def latencies(seed, count):
+    return np.random.default_rng(seed).lognormal(6.0, 2.0, count)
+
+
+def test_small_values_are_exact():
+    histogram = LogBucketHistogram(1, 60 * 60 * 1000, 2)
+    histogram.record_values(np.arange(1.0, 101.0))
+    assert histogram.get_total_count() == 100
+    assert histogram.get_value_at_percentile(50) == 50
+    assert histogram.get_value_at_percentile(99) == 99
+    assert histogram.get_value_at_percentile(100) == 100
+    assert histogram.get_max_value() == 100
+
+
+def test_vectorized_indexes_match_the_scalar_ones():
+    histogram = LogBucketHistogram(1, 60 * 60 * 1000, 2)
+    values = np.unique(np.concatenate([np.arange(0, 5000),
+                                       latencies(1, 5000).astype(np.int64)]))
+    values = values[values < 60 * 60 * 1000]
+    assert list(histogram.counts_indexes(values)) == [
+        histogram.counts_index(int(value)) for value in values]
+
+
+def test_rows_are_independent():
+    histogram = LogBucketHistogram(1, 60 * 60 * 1000, 2, 3)
+    values = latencies(2, 3000)
+    rows = np.arange(3000) % 3
+    histogram.record_values(values, rows)
+    for row in range(3):
+        single = LogBucketHistogram(1, 60 * 60 * 1000, 2)
+        for value in values[rows == row]:
+            single.record_value(value)
+        assert np.array_equal(histogram.counts[row], single.counts[0])
+        assert histogram.get_max_value(row) == single.get_max_value()
+
+
+def test_matches_hdr_histogram():
+    hdrh = pytest.importorskip('hdrh.histogram')
+    values = latencies(3, 100000)
+    # Both track values up to the end of the last power of two range
+    # reaching the highest value, and drop the ones past it
+    values = np.append(values, [0.0, 0.5, 4e6, 1e7])
+
+    histogram = LogBucketHistogram(1, 60 * 60 * 1000, 2)
+    histogram.record_values(values)
+    reference = hdrh.HdrHistogram(1, 60 * 60 * 1000, 2)
+    for value in values:
+        reference.record_value(int(value))
+
+    assert histogram.get_total_count() == reference.get_total_count()
+    assert histogram.get_max_value() == reference.get_max_value()
+    for percentile in PERCENTILES:
+        assert (histogram.get_value_at_percentile(percentile) ==
+                reference.get_value_at_percentile(percentile))
@@ -0,0 +1,171 @@
+import argparse
+import random
+
+from engine.engine import SimpyEngine
+from host.host import DEFAULT_KEEP_ALIVE, StealCoordinator, WarmContainerPool
+from queues.request_queue import FIFORequestQueue
+from request.request import Request
+
+FLOW = {'work_gen': 'exponential_request', 'inter_gen': 'poisson_arrival',
+        'mean': 1.0, 'load': 0.9, 'time_slice': 0.0, 'preemption': 0.0,
+        'enq_front': False}
+FLOW_CONFIG = [FLOW]
+
+# Runs the simulator comparing the core picked from the heap of running
+# requests with a scan of every active core, whenever a request arrives at
+# a busy host. Records whether each of them preempted the victim.
+CHECKED_SRPT = '''
+from host.host import SRPTQueueHost
+
+checked = []
+receive_request = SRPTQueueHost.receive_request
+
+
+def projected_completion(core):
+    return core.start_time + core.request.exec_time
+
+
+def checked_receive_request(self, request):
+    if not self.core_group.available():
+        core = self.longest_running_core()
+        running = [core for core in self.core_group.active_cores
+                   if hasattr(core, 'request')]
+        if running:
+            assert projected_completion(core) == max(
+                projected_completion(core) for core in running)
+            checked.append(projected_completion(core) - self.env.now >
+                           request.exec_time)
+    receive_request(self, request)
+
+
+SRPTQueueHost.receive_request = checked_receive_request
+
+import sim
+sim.main()
+assert len(checked) > 50 and any(checked)
+'''
+
+
+def test_srpt_victim_has_the_most_remaining_work(simulate):
+    simulate([FLOW], ['-s', 1, '-t', 15, '-c', 2, '-w', 2,
+                      '--controller-type', 'leastloadedsrpt'],
+             command=('-c', CHECKED_SRPT))
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+
+class SweptContainers(object):
+    # The sweep WarmContainerPool replaced, with per-flow keep-alives
+
+    def __init__(self, clock, keep_alive):
+        self.clock = clock
+        self.keep_alive = keep_alive
+        self.hot_data = dict()
+
+    def start(self, flow_id):
+        stale = list()
+        for key, val in self.hot_data.items():
+            if (key != flow_id and
+                    self.clock.now - val >= self.keep_alive[key]):
+                stale.append(key)
+        for key in stale:
+            del self.hot_data[key]
+        self.hot_data[flow_id] = self.clock.now
+
+    def steal(self, flow_id):
+        self.hot_data[flow_id] = self.clock.now
+
+
+def test_warm_container_pool_matches_the_sweep():
+    rng = random.Random(9)
+    flow_config = [{'keep_alive': rng.choice([0.5, 2.0, 5.0])}
+                   for flow_id in range(20)]
+    flow_config.append({})
+    clock = Clock()
+    pool = WarmContainerPool(clock, flow_config)
+    swept = SweptContainers(clock, [flow.get('keep_alive', DEFAULT_KEEP_ALIVE)
+                                    for flow in flow_config])
+
+    for step in range(20000):
+        clock.now += rng.expovariate(10.0)
+        # Mostly a few hot flows, so that superseded timers pile up
+        flow_id = rng.choice([0, 1, 20] if rng.random() < 0.8 else
+                             range(len(flow_config)))
+        assert (flow_id in pool) == (flow_id in swept.hot_data)
+        if rng.random() < 0.1:
+            pool.touch(flow_id)
+            swept.steal(flow_id)
+        else:
+            pool.evict()
+            pool.touch(flow_id)
+            swept.start(flow_id)
+        assert set(pool.keys()) == set(swept.hot_data)
+        assert len(pool) == len(swept.hot_data)
+    assert len(pool.timers) <= 2 * len(pool.last_use) + 64
+
+
+class QueueHost(object):
+
+    def __init__(self, env, worker_id):
+        self.worker_id = worker_id
+        self.queue = FIFORequestQueue(env, -1, 0.0, FLOW_CONFIG)
+        self.hot_data = WarmContainerPool(env, FLOW_CONFIG)
+
+
+def test_steal_coordinator_spreads_thieves_over_busy_hosts():
+    env = SimpyEngine()
+    hosts = [QueueHost(env, i) for i in range(5)]
+    coordinator = StealCoordinator(env, hosts, 0.0, argparse.Namespace(
+        steal_hot=False, steal_maximum=6, steal_timer=1.0,
+        steal_threshold=2))
+    for host, length in zip(hosts, [10, 0, 1, 7, 12]):
+        for idx in range(length):
+            host.queue.enqueue(Request(idx, 1.0, 0.0, 0, 1.0))
+    rounds = []
+
+    def steal(thief, victim):
+        rounds.append((thief.worker_id, victim.worker_id))
+        yield env.timeout(0)
+
+    coordinator.steal = steal
+    env.run(until=1.5)
+    # The light hosts take the busiest host left once earlier thieves'
+    # promised requests are counted
+    assert rounds == [(1, 4), (2, 0)]
+    assert [coordinator.queue_lengths[i] for i in range(5)] == [10, 0, 1, 7,
+                                                                12]
+
+
+# Runs the simulator checking that the coordinator's index matches the
+# hosts' queue lengths whenever a steal starts
+CHECKED_STEAL = '''
+from host.host import StealCoordinator
+
+steals = []
+steal = StealCoordinator.steal
+
+
+def counted_steal(self, thief, victim):
+    lengths = [len(host.queue) for host in self.hosts]
+    assert [self.queue_lengths[i] for i in range(len(lengths))] == lengths
+    steals.append((thief, victim))
+    return steal(self, thief, victim)
+
+
+StealCoordinator.steal = counted_steal
+
+import sim
+sim.main()
+assert len(steals) > 10
+'''
+
+
+def test_steal_index_tracks_the_host_queues(simulate):
+    simulate([FLOW], ['-s', 1, '-t', 150, '-c', 2, '-w', 4,
+                      '--controller-type', 'random', '--steal-work',
+                      '--steal-timer', 5.0, '--steal-threshold', 1],
+             command=('-c', CHECKED_STEAL))
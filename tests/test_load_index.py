@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from controller.load_index import LoadIndex
+
+
+def scan_least_loaded(loads, weights, offset):
+    # The linear scans the controllers used before, lowest index on ties
+    keys = [1.0 * (load + offset) / (weights[i] if weights else 1)
+            for i, load in enumerate(loads)]
+    return keys.index(min(keys))
+
+
+def scan_first_fit(loads, limits):
+    for i, load in enumerate(loads):
+        if load < limits[i]:
+            return i
+    return -1
+
+
+@pytest.mark.parametrize('num_workers', [1, 2, 5, 8, 13])
+@pytest.mark.parametrize('weighted', [False, True])
+def test_load_index_matches_linear_scans(num_workers, weighted):
+    rng = random.Random(num_workers)
+    limits = [rng.randint(1, 4) for i in range(num_workers)]
+    weights = ([rng.choice([1, 2, 3]) for i in range(num_workers)]
+               if weighted else None)
+    offset = 1 if weighted else 0
+    index = LoadIndex(num_workers, limits, weights, offset)
+    loads = [0] * num_workers
+
+    for step in range(3000):
+        worker = rng.randrange(num_workers)
+        # Keep loads small, so that ties and full workers are common
+        delta = 1 if loads[worker] == 0 or rng.random() < 0.5 else -1
+        if loads[worker] >= 5:
+            delta = -1
+        index.add(worker, delta)
+        loads[worker] += delta
+
+        assert [index[i] for i in range(num_workers)] == loads
+        least = scan_least_loaded(loads, weights, offset)
+        assert index.least_loaded() == least
+        assert index.min_load() == loads[least]
+        assert index.first_fit() == scan_first_fit(loads, limits)
+
+
+def test_load_index_without_limits():
+    index = LoadIndex(3)
+    index.add(0, 2)
+    index.add(1, 1)
+    index.add(2, 1)
+    assert index.least_loaded() == 1
+    assert index.min_load() == 1
@@ -0,0 +1,74 @@
+import os
+import time
+
+import pytest
+
+from simulation import simulation
+from simulation.simulation import (build_simulation, close_outputs,
+                                   default_options, run_branch,
+                                   run_replications)
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+
+
+def options(**kwargs):
+    kwargs.setdefault('window', 30.0)
+    return default_options(sim_time=50, cores=4, workers=2, **kwargs)
+
+
+def test_replications_continue_the_shared_warmup():
+    replications = run_replications([FLOW], options(), 3, processes=2)
+    assert len(replications) == 3
+    assert all(flow['shared_warmup'] for results in replications
+               for flow in results)
+    assert replications[0] != replications[1]
+
+    # Each forked replication gives what running its branch in process does
+    opts = options()
+    env, histograms, multigenerator, seed_sequence = build_simulation(
+        [FLOW], opts)
+    env.run(until=opts.window)
+    branch_seed = seed_sequence.spawn(3)[1]
+    assert run_branch(env, histograms, multigenerator, opts,
+                      branch_seed) == replications[1]
+    close_outputs(opts)
+
+
+def test_replications_do_not_depend_on_the_process_count():
+    assert (run_replications([FLOW], options(), 3, processes=1) ==
+            run_replications([FLOW], options(), 3, processes=3))
+
+
+def test_failed_replication_stops_the_others(monkeypatch):
+    run_branch = simulation.run_branch
+
+    def failing_branch(env, histograms, multigenerator, opts, branch_seed):
+        if branch_seed.spawn_key == (2,):
+            raise RuntimeError('replication failed')
+        time.sleep(60)
+        return run_branch(env, histograms, multigenerator, opts, branch_seed)
+
+    monkeypatch.setattr(simulation, 'run_branch', failing_branch)
+    start = time.time()
+    with pytest.raises(RuntimeError):
+        run_replications([FLOW], options(), 4, processes=3)
+    assert time.time() - start < 30
+    with pytest.raises(ChildProcessError):
+        os.waitpid(-1, os.WNOHANG)
+
+
+def test_run_ending_in_the_warmup():
+    # The region of interest is over before the window starts
+    replications = run_replications([FLOW], options(window=500.0), 2)
+    assert len(replications) == 2
+    assert replications[0] == replications[1]
+    assert replications[0][0]['shared_warmup']
+    assert replications[0][0]['total_completed'] == 0
+
+
+def test_replications_cannot_write_outputs(tmp_path):
+    with pytest.raises(ValueError):
+        run_replications([FLOW], options(
+            trace_file=str(tmp_path / 'trace.npy')), 2)
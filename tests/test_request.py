@@ -0,0 +1,46 @@
+import ast
+import glob
+import os
+
+import pytest
+
+from request.request import Request
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def request_attributes():
+    # Attributes assigned anywhere in the simulator on objects named like
+    # requests, such as request.exec_time or self.request.exec_time
+    for filename in glob.glob(os.path.join(SRC, '**', '*.py'),
+                              recursive=True):
+        with open(filename) as f:
+            tree = ast.parse(f.read(), filename)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign):
+                targets = node.targets
+            elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+                targets = [node.target]
+            else:
+                continue
+            for target in targets:
+                if not isinstance(target, ast.Attribute):
+                    continue
+                owner = target.value
+                name = getattr(owner, 'id', getattr(owner, 'attr', ''))
+                if name.endswith('request'):
+                    yield filename, target.lineno, target.attr
+
+
+def test_request_has_no_dict():
+    request = Request(0, 1.0, 0.0, 0, 1.0)
+    assert not hasattr(request, '__dict__')
+    with pytest.raises(AttributeError):
+        request.undeclared = True
+
+
+def test_assigned_attributes_are_declared():
+    undeclared = [(os.path.relpath(filename, SRC), line, attr)
+                  for filename, line, attr in request_attributes()
+                  if attr not in Request.__slots__]
+    assert undeclared == []
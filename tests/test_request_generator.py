@@ -0,0 +1,70 @@
+import numpy as np
+import simpy
+
+from request.request_generator import HeavyTailRequestGenerator
+from request.interarrival_generator import PoissonArrivalGenerator
+from simulation.simulation import default_options, run_simulation
+
+
+class RequestRecorder(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def receive_request(self, request):
+        self.requests.append(request)
+
+
+class ArrivalCounter(object):
+
+    def __init__(self):
+        self.arrivals = 0
+
+    def add_request(self):
+        self.arrivals += 1
+
+
+def heavy_tail_flow(**kwargs):
+    flow = {'work_gen': 'heavy_tail', 'inter_gen': 'poisson_arrival',
+            'load': 0.5, 'exec_time': 1.0, 'heavy_time': 100.0,
+            'heavy_per': 2, 'time_slice': 0.0, 'preemption': 0.0,
+            'enq_front': False}
+    flow.update(kwargs)
+    return flow
+
+
+def draw_requests(flow, until=20000):
+    env = simpy.Environment()
+    host = RequestRecorder()
+    hist = ArrivalCounter()
+    gen = HeavyTailRequestGenerator(hist, env, host, PoissonArrivalGenerator,
+                                    4, flow, np.random.default_rng(1),
+                                    np.random.default_rng(2))
+    gen.begin_generation()
+    env.run(until=until)
+    assert hist.arrivals == len(host.requests)
+    return host.requests
+
+
+def test_heavy_tail_draws_heavy_requests_at_the_given_rate():
+    requests = draw_requests(heavy_tail_flow())
+    exec_times = np.array([request.exec_time for request in requests])
+    assert set(exec_times) == {1.0, 100.0}
+    assert abs((exec_times == 100.0).mean() - 0.02) < 0.005
+    # Arrivals are spaced to give the load over the 4 cores
+    mean = 0.02 * 100.0 + 0.98 * 1.0
+    assert abs(len(requests) - 20000 * 0.5 * 4 / mean) < 0.05 * len(requests)
+
+
+def test_heavy_tail_request_types():
+    # Most requests are of the first type, the others of one of 49 more
+    idx = np.array([request.idx for request in
+                    draw_requests(heavy_tail_flow(request_types=50))])
+    assert idx.min() == 0 and idx.max() < 50
+    assert abs((idx == 0).mean() - 0.98) < 0.01
+
+
+def test_heavy_tail_simulation():
+    results = run_simulation([heavy_tail_flow()],
+                             default_options(sim_time=200, cores=4))
+    assert results[0]['total_completed'] > 0
@@ -0,0 +1,48 @@
+import numpy as np
+
+from request.request import Request
+from util.request_log import RequestLog
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+
+
+def test_records_load_with_numpy_across_chunks(tmp_path):
+    filename = str(tmp_path / 'requests.npy')
+    log = RequestLog(filename, chunk_size=7)
+    for idx in range(50):
+        request = Request(idx, 0.5 * idx, float(idx), idx % 3, 0.5 * idx)
+        request.dispatch_time = idx + 0.25
+        request.run_start_time = idx + 0.5
+        request.cold_start = idx % 2 == 0
+        log.record(request, idx % 4, idx % 5, idx + 1.0)
+    log.close()
+
+    for records in (np.load(filename), np.load(filename, mmap_mode='r')):
+        assert len(records) == 50
+        assert list(records['idx']) == list(range(50))
+        assert list(records['flow_id']) == [idx % 3 for idx in range(50)]
+        assert list(records['cold']) == [idx % 2 == 0 for idx in range(50)]
+        assert np.array_equal(records['start'], np.arange(50) + 0.5)
+        assert np.array_equal(records['exec_time'], 0.5 * np.arange(50))
+
+
+def test_simulation_records(simulate, tmp_path):
+    filename = str(tmp_path / 'requests.npy')
+    results = simulate([FLOW], ['-s', 1, '-t', 100, '-c', 4, '-w', 2, '-d',
+                                20.0, '--print-values', '--output-file',
+                                filename])
+
+    records = np.load(filename)
+    assert len(np.unique(records['idx'])) == len(records)
+    assert (records['arrival'] <= records['dispatch']).all()
+    assert (records['dispatch'] <= records['start']).all()
+    assert (records['start'] < records['finish']).all()
+    # Every completion is written, the measured ones are told apart by
+    # their arrival
+    measured = records[(records['arrival'] >= 20.0) &
+                       (records['arrival'] <= 200.0)]
+    assert len(measured) == results[0]['total_completed']
+    assert np.isclose((measured['finish'] - measured['arrival']).mean(),
+                      results[0]['latency_avg'], rtol=1e-3)
@@ -0,0 +1,108 @@
+import bisect
+import random
+
+from engine.engine import SimpyEngine
+from request.request import Request
+from queues.request_queue import SRPTRequestQueue, FlowIndexedFIFORequestQueue
+
+FLOW_CONFIG = [{'enq_front': False}]
+
+
+class SortedListQueue(object):
+    # The sorted list implementation SRPTRequestQueue replaced
+
+    def __init__(self):
+        self.q = []
+
+    def enqueue(self, request):
+        bisect.insort(self.q, request)
+
+    def dequeue(self):
+        if len(self.q) == 0:
+            return None
+        value = self.q[0]
+        del self.q[0]
+        return value
+
+
+def make_request(idx, exec_time):
+    return Request(idx, exec_time, 0.0, 0, exec_time)
+
+
+def srpt_queue():
+    return SRPTRequestQueue(SimpyEngine(), -1, 0.0, FLOW_CONFIG)
+
+
+def test_srpt_queue_matches_the_sorted_list():
+    rng = random.Random(11)
+    queue, reference = srpt_queue(), SortedListQueue()
+    for idx in range(5000):
+        if rng.random() < 0.55:
+            # Few distinct execution times, so that ties are common
+            request = make_request(idx, rng.choice([1.0, 2.0, 5.0, 10.0]))
+            queue.enqueue(request)
+            reference.enqueue(request)
+        else:
+            assert queue.dequeue() is reference.dequeue()
+        assert len(queue) == len(reference.q)
+    while reference.q:
+        assert queue.dequeue() is reference.dequeue()
+    assert queue.empty() and queue.dequeue() is None
+
+
+def test_srpt_queue_front_requests_come_first_latest_first():
+    queue = srpt_queue()
+    short, long, first, second = [make_request(idx, exec_time) for
+                                  idx, exec_time in enumerate([1, 9, 50, 70])]
+    queue.enqueue(long)
+    queue.enqueue_front(first)
+    queue.enqueue(short)
+    queue.enqueue_front(second)
+    assert [queue.dequeue() for i in range(4)] == [second, first, short,
+                                                   long]
+
+
+def test_srpt_queue_remove():
+    queue = srpt_queue()
+    requests = [make_request(idx, idx + 1.0) for idx in range(5)]
+    for request in requests:
+        queue.enqueue(request)
+    queue.remove(requests[0])
+    queue.remove(requests[3])
+    assert len(queue) == 3
+    assert [queue.dequeue() for i in range(4)] == [requests[1], requests[2],
+                                                   requests[4], None]
+
+
+def test_take_flows_matches_a_queue_walk():
+    # The oldest requests of the given flows, taken by walking the queue
+    rng = random.Random(13)
+    flow_config = [{'enq_front': False} for flow_id in range(6)]
+    queue = FlowIndexedFIFORequestQueue(SimpyEngine(), -1, 0.0, flow_config)
+    reference = []
+    lengths = []
+    queue.watcher = lengths.append
+
+    for idx in range(5000):
+        action = rng.random()
+        if action < 0.4:
+            request = Request(idx, 1.0, 0.0, rng.randrange(6), 1.0)
+            queue.enqueue(request)
+            reference.append(request)
+        elif action < 0.5:
+            request = Request(idx, 1.0, 0.0, rng.randrange(6), 1.0)
+            queue.enqueue_front(request)
+            reference.insert(0, request)
+        elif action < 0.8:
+            assert queue.dequeue() is (reference.pop(0) if reference
+                                       else None)
+        else:
+            flows = rng.sample(range(6), rng.randint(1, 3))
+            count = rng.randint(1, 4)
+            expected = [request for request in reference
+                        if request.flow_id in flows][:count]
+            for request in expected:
+                reference.remove(request)
+            assert queue.take_flows(flows, count) == expected
+        assert len(queue) == len(reference) == sum(lengths)
+        assert queue.empty() == (not reference)
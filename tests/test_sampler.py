@@ -0,0 +1,50 @@
+import numpy as np
+
+from request.sampler import (ExponentialSampler, LogNormalSampler,
+                             ParetoSampler, TruncatedNormalSampler)
+
+
+def sample(sampler, count):
+    return np.array([sampler.next() for i in range(count)])
+
+
+def test_blocks_continue_the_stream():
+    # Values served across block boundaries are the generator's stream
+    values = sample(ExponentialSampler(np.random.default_rng(7), 2.0,
+                                       block_size=10), 35)
+    stream = np.random.default_rng(7)
+    expected = np.concatenate([stream.exponential(2.0, 10)
+                               for i in range(4)])
+    assert np.array_equal(values, expected[:35])
+
+
+def test_reseed_drops_the_rest_of_the_block():
+    sampler = ExponentialSampler(np.random.default_rng(1), 1.0, block_size=8)
+    sample(sampler, 3)
+    sampler.reseed(np.random.default_rng(2))
+    assert np.array_equal(sample(sampler, 8),
+                          np.random.default_rng(2).exponential(1.0, 8))
+
+
+def test_distribution_means():
+    n = 200000
+    rng = np.random.default_rng(3)
+    values = sample(ExponentialSampler(rng, 4.0), n)
+    assert abs(values.mean() - 4.0) < 0.05
+    values = sample(LogNormalSampler(rng, -0.38, 0.5), n)
+    assert abs(values.mean() - np.exp(-0.38 + 0.5 ** 2 / 2)) < 0.01
+    # Pareto with shape a and minimum mu has mean a * mu / (a - 1)
+    values = sample(ParetoSampler(rng, 3.0, 2.0), n)
+    assert values.min() >= 2.0
+    assert abs(values.mean() - 3.0) < 0.03
+
+
+def test_truncated_normal_stays_within_bounds():
+    rng = np.random.default_rng(4)
+    values = sample(TruncatedNormalSampler(rng, 1.0, 1.0, 0.0, 1.0,
+                                           block_size=1000), 5000)
+    assert values.min() >= 0.0 and values.max() <= 1.0
+    # Mean of a standard normal truncated to [-1, 0], shifted by 1
+    pdf = np.exp(-0.5) / np.sqrt(2 * np.pi)
+    expected = 1.0 - (1 / np.sqrt(2 * np.pi) - pdf) / 0.3413447
+    assert abs(values.mean() - expected) < 0.02
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from engine.engine import SimpyEngine
+from simulation.simulation import (build_simulation, close_outputs,
+                                   default_options, run_simulation)
+from util import saturation
+from util.saturation import (MIN_BACKLOG, MIN_HORIZON_SAMPLES,
+                             SaturationDetector)
+
+FLOW = {'work_gen': 'exponential_request', 'inter_gen': 'poisson_arrival',
+        'mean': 1.0, 'load': 0.5, 'time_slice': 0.0, 'preemption': 0.0,
+        'enq_front': False}
+
+# Heavy tailed and time sliced, with long excursions of the backlog even
+# when stable
+HEAVY_TAIL = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+              'mean': -0.38, 'std_dev_request': 2.36, 'time_slice': 0.5,
+              'preemption': 0.0, 'enq_front': False}
+
+
+def detector_with(samples):
+    detector = SaturationDetector(SimpyEngine(), None, 4, 10.0)
+    detector.totals.extend(np.cumsum(samples))
+    return detector
+
+
+def test_growing_backlog():
+    rising = [MIN_BACKLOG + 0.1 * i for i in range(MIN_HORIZON_SAMPLES)]
+    assert detector_with(rising).growing()
+    # The horizon is the last half of the samples
+    assert detector_with([MIN_BACKLOG] * len(rising) + rising).growing()
+
+    flat = [MIN_BACKLOG + 1.0 + 0.5 * (i % 2)
+            for i in range(MIN_HORIZON_SAMPLES)]
+    assert not detector_with(flat).growing()
+
+    # Too few samples, or a backlog too small to matter
+    assert not detector_with(rising[:-1]).growing()
+    small = [0.005 * i for i in range(MIN_HORIZON_SAMPLES)]
+    assert not detector_with(small).growing()
+
+    # A backlog that rose and then levelled off over the horizon
+    excursion = rising[:MIN_HORIZON_SAMPLES // 2]
+    excursion += [excursion[-1]] * (MIN_HORIZON_SAMPLES // 2)
+    assert not detector_with(excursion).growing()
+
+
+def test_stable_run_is_not_aborted():
+    full = run_simulation([FLOW], default_options(
+        sim_time=2000, cores=4, workers=2))[0]
+    checked = run_simulation([FLOW], default_options(
+        sim_time=2000, cores=4, workers=2, abort_saturated=True))[0]
+    assert not checked.pop('saturated')
+    # Only the throughput is measured differently, over the region of
+    # interest
+    assert (checked.pop('total_throughput') ==
+            checked['total_completed'] / (2 * 2000.0))
+    full.pop('total_throughput')
+    assert checked == full
+
+
+def test_overloaded_run_is_aborted():
+    overloaded = dict(FLOW, load=1.5)
+    results = run_simulation([overloaded], default_options(
+        sim_time=5000, cores=4, workers=2, abort_saturated=True))[0]
+    assert results['saturated']
+    assert results['saturated_at'] < 2 * 5000
+    assert results['censored_requests'] > 0
+    # Throughput only counts the completed requests, at most the capacity
+    assert 0 < results['total_throughput'] <= 4 * 2 / overloaded['mean']
+
+
+@pytest.mark.parametrize('load,seed', [(0.9, 1001), (0.95, 1001),
+                                       (0.95, 1002)])
+def test_stable_heavy_tailed_run_is_not_flagged(load, seed):
+    opts = default_options(seed=seed, sim_time=1800, cores=12, workers=4,
+                           controller_type='leastloaded', abort_saturated=True)
+    try:
+        env, histograms, _, _ = build_simulation(
+            [dict(HEAVY_TAIL, load=load)], opts)
+        # The detector only samples the region of interest
+        env.run(until=histograms.window_end + 100 * opts.saturation_interval)
+        assert saturation.detector.saturated_at is None
+        assert (len(saturation.detector.totals) - 1 ==
+                histograms.window_end / opts.saturation_interval)
+    finally:
+        close_outputs(opts)
@@ -0,0 +1,42 @@
+import simpy
+
+from scheduler.scheduler import CoreScheduler
+
+
+class DrainedQueue(object):
+    # Looks busy, but the request has been taken by the time the lock is held
+    dequeue_time = 0.0
+
+    def __init__(self, env):
+        self.resource = simpy.Resource(env, capacity=1)
+
+    def empty(self):
+        return False
+
+    def dequeue(self):
+        return None
+
+
+class Host(object):
+
+    def __init__(self):
+        self.idle = []
+
+    def core_become_idle(self, core, request):
+        self.idle.append((core, request))
+
+
+def test_core_goes_idle_when_the_queue_was_drained():
+    env = simpy.Environment()
+    core = CoreScheduler(env, None, None, 0, 0, [])
+    queue = DrainedQueue(env)
+    host = Host()
+    core.set_queue(queue)
+    core.set_host(host)
+
+    env.process(core.become_active())
+    env.run()
+
+    assert not core.active
+    assert host.idle == [(core, None)]
+    assert queue.resource.count == 0
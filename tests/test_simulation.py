@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from request.request_generator import MultipleRequestGenerator
+from simulation.simulation import default_options, run_simulation
+from util import request_log, saturation, stopping, timeseries, trace
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+HEAVY_TAIL = {'work_gen': 'heavy_tail', 'inter_gen': 'poisson_arrival',
+              'load': 0.3, 'exec_time': 1.0, 'heavy_time': 20.0,
+              'heavy_per': 2, 'request_types': 50, 'time_slice': 0.0,
+              'preemption': 0.0, 'enq_front': False}
+
+
+def test_run_simulation_matches_the_command_line(simulate):
+    output = simulate([FLOW], ['-t', 100, '-c', 4, '-w', 2,
+                               '--controller-type', 'leastloaded'])
+    results = run_simulation([FLOW], default_options(
+        sim_time=100, cores=4, workers=2, controller_type='leastloaded'))
+    assert output == results
+
+
+def logged_requests(tmp_path, controller_type):
+    filename = str(tmp_path / (controller_type + '.npy'))
+    run_simulation([dict(FLOW, load=0.5), HEAVY_TAIL], default_options(
+        seed=5, sim_time=100, cores=4, workers=3,
+        controller_type=controller_type, print_values=True,
+        output_file=filename))
+    records = np.load(filename)
+    # Every request arriving by the end of the region completes
+    records = records[records['arrival'] <= 200]
+    return sorted(zip(records['flow_id'], records['idx'], records['arrival'],
+                      records['exec_time']))
+
+
+def test_policies_see_the_same_requests(tmp_path):
+    # Heavy tail flows used to share the controllers' generator
+    requests = logged_requests(tmp_path, 'random')
+    assert len(requests) > 500
+    assert len(set(flow for flow, _, _, _ in requests)) == 2
+    for controller_type in ('leastloaded', 'jiq'):
+        assert logged_requests(tmp_path, controller_type) == requests
+
+
+def test_repeated_runs_give_the_same_results():
+    opts = default_options(sim_time=100, cores=4, workers=2)
+    assert run_simulation([FLOW], opts) == run_simulation([FLOW], opts)
+
+
+def test_run_simulation_does_not_change_its_options():
+    opts = default_options(sim_time=50, host_type='shinjuku')
+    run_simulation([FLOW], opts)
+    assert opts.cores == 8
+
+
+def test_failed_run_closes_its_outputs(tmp_path, monkeypatch):
+    def fail(self):
+        raise RuntimeError('generation failed')
+
+    monkeypatch.setattr(MultipleRequestGenerator, 'begin_generation', fail)
+    with pytest.raises(RuntimeError):
+        run_simulation([FLOW], default_options(
+            sim_time=50, print_values=True,
+            output_file=str(tmp_path / 'requests.npy'),
+            timeseries_file=str(tmp_path / 'windows.bin'),
+            trace_file=str(tmp_path / 'trace.npy'), stop_precision=0.05,
+            abort_saturated=True))
+    assert not (trace.ENABLED or timeseries.ENABLED or request_log.ENABLED or
+                stopping.ENABLED or saturation.ENABLED)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from simulation.simulation import default_options, run_simulation
+from util.stopping import half_width, mser_truncation, t_quantile
+
+# Light tailed flow, so that a short run gets precise estimates
+FLOW = {'work_gen': 'exponential_request', 'inter_gen': 'poisson_arrival',
+        'mean': 1.0, 'load': 0.7, 'time_slice': 0.0, 'preemption': 0.0,
+        'enq_front': False}
+
+
+def test_t_quantile():
+    assert t_quantile(1) == 12.706
+    assert t_quantile(10) == 2.228
+    assert t_quantile(30) == 2.042
+    assert t_quantile(1000) == 1.96
+
+
+def test_half_width():
+    assert np.isclose(half_width([1, 2, 3, 4, 5]),
+                      2.776 * np.sqrt(2.5) / np.sqrt(5))
+
+
+def test_mser_truncates_the_transient():
+    assert mser_truncation([10, 8, 6, 4] + [1] * 20) == 4
+
+    assert mser_truncation([5, 4, 3, 2] + [1.1, 0.9] * 10) == 4
+    # Nothing to truncate in a stationary series
+    assert mser_truncation([1.1, 0.9] * 12) == 0
+
+
+def test_stopping_run_agrees_with_a_full_run():
+    full = run_simulation([FLOW], default_options(
+        sim_time=2000, cores=4, workers=2))[0]
+    stopped = run_simulation([FLOW], default_options(
+        sim_time=20000, cores=4, workers=2, stop_precision=0.05,
+        stop_metrics='mean'))[0]
+    assert stopped['converged']
+    assert stopped['total_completed'] < full['total_completed']
+    assert (abs(stopped['latency_avg'] - full['latency_avg']) <
+            3 * stopped['latency_avg_ci'])
+    # The throughput of the stopped run is measured over its region, that of
+    # the full run over the simulation time as it always was
+    rate = FLOW['load'] * 4 * 2 / FLOW['mean']
+    assert np.isclose(stopped['total_throughput'], rate, rtol=0.05)
+    assert full['total_throughput'] == full['total_completed'] / 2000.0
+
+
+def test_unconverged_run_measures_throughput_over_its_region():
+    results = run_simulation([FLOW], default_options(
+        sim_time=2000, cores=4, workers=2, stop_precision=0.0001,
+        stop_metrics='mean'))[0]
+    assert not results['converged']
+    assert results['warmup_end'] > 0
+    rate = FLOW['load'] * 4 * 2 / FLOW['mean']
+    assert np.isclose(results['total_throughput'], rate, rtol=0.05)
@@ -0,0 +1,135 @@
+import copy
+
+import pytest
+
+from simulation import sweep
+from simulation.cache import ResultCache, SweepStore, cache_key, cacheable
+from simulation.simulation import default_options, run_simulation
+from simulation.sweep import SweepJob, predicted_cost, run_sweep
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+
+
+def sweep_jobs():
+    jobs = []
+    for load in (0.3, 0.6):
+        flow_config = [dict(FLOW, load=load)]
+        for seed in (1, 2):
+            jobs.append(SweepJob(flow_config, {'sim_time': 50, 'cores': 4,
+                                               'workers': 2}, seed,
+                                 (load, seed)))
+    return jobs
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_sweep_matches_single_runs(processes):
+    jobs = sweep_jobs()
+    swept = list(run_sweep(jobs, processes=processes))
+    assert sorted(job.tag for job, _ in swept) == sorted(job.tag
+                                                         for job in jobs)
+    for job, results in swept:
+        options = default_options(seed=job.seed, **job.options)
+        assert results == run_simulation(job.flow_config, options)
+
+
+def test_sweep_starts_the_longest_jobs_first():
+    jobs = sweep_jobs()
+    order = [job.tag for job, _ in run_sweep(jobs, processes=1)]
+    assert order == [job.tag for job in sorted(jobs, key=predicted_cost,
+                                               reverse=True)]
+    assert order[0][0] == 0.6
+
+
+def test_cache_key_depends_on_the_results_only():
+    job = sweep_jobs()[0]
+    opts = job.get_options()
+    key = cache_key(job.flow_config, opts)
+    assert key == cache_key(copy.deepcopy(job.flow_config),
+                            job.get_options())
+    # Options that do not change the results
+    for name, value in [('verbose', 2), ('hist', True),
+                        ('engine', 'calendar'), ('timeseries_window', 5.0)]:
+        options = dict(job.options, seed=job.seed)
+        options[name] = value
+        assert cache_key(job.flow_config, default_options(**options)) == key
+    # Options and flows that do
+    for name, value in [('seed', 2), ('cores', 8), ('latency', 0.1),
+                        ('window', 10.0), ('abort_saturated', True)]:
+        options = dict(job.options, seed=job.seed)
+        options[name] = value
+        assert cache_key(job.flow_config, default_options(**options)) != key
+    assert cache_key([dict(job.flow_config[0], load=0.31)], opts) != key
+
+
+def test_cached_sweep_does_not_rerun_jobs(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    jobs = sweep_jobs()
+    first = dict((job.tag, results) for job, results in
+                 run_sweep(jobs, processes=1, cache=cache))
+
+    def run_jobs(jobs, processes):
+        assert not jobs
+        return iter(())
+
+    monkeypatch.setattr(sweep, 'run_jobs', run_jobs)
+    second = dict((job.tag, results) for job, results in
+                  run_sweep(sweep_jobs(), processes=1, cache=cache))
+    assert second == first
+
+
+def test_runs_writing_outputs_are_not_cached(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    job = SweepJob([FLOW], {'sim_time': 20, 'trace_file':
+                            str(tmp_path / 'trace.npy')}, 1)
+    list(run_sweep([job], processes=1, cache=cache))
+    assert not cacheable(job.get_options())
+    assert cache_key(job.flow_config, job.get_options()) not in cache
+
+
+def test_store_drops_a_line_cut_short(tmp_path):
+    filename = str(tmp_path / 'sweep.jobs')
+    store = SweepStore(filename)
+    store['a'] = [{'x': 1}]
+    store['b'] = [{'x': 2}]
+    store.close()
+    # A crash in the middle of writing the third line
+    with open(filename, 'ab') as f:
+        f.write(b'{"key": "c", "res')
+
+    store = SweepStore(filename)
+    assert 'a' in store and 'b' in store and 'c' not in store
+    assert store['b'] == [{'x': 2}]
+    store['c'] = None
+    store.close()
+    assert SweepStore(filename).results == {'a': [{'x': 1}],
+                                            'b': [{'x': 2}], 'c': None}
+
+
+def test_interrupted_sweep_resumes(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'sweep.jobs')
+    complete = dict((job.tag, results) for job, results in
+                    run_sweep(sweep_jobs(), processes=1))
+
+    # Stop the sweep after two jobs
+    store = SweepStore(filename)
+    swept = run_sweep(sweep_jobs(), processes=1, store=store)
+    done = [next(swept)[0].tag, next(swept)[0].tag]
+    swept.close()
+    store.close()
+
+    ran = []
+    run_job = sweep.run_job
+
+    def counted_run_job(args):
+        ran.append(args[1].tag)
+        return run_job(args)
+
+    monkeypatch.setattr(sweep, 'run_job', counted_run_job)
+    store = SweepStore(filename)
+    resumed = dict((job.tag, results) for job, results in
+                   run_sweep(sweep_jobs(), processes=1, store=store))
+    store.close()
+    assert sorted(ran) == sorted(set(complete) - set(done))
+    assert resumed == complete
@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+
+from util import trace
+from util.timeseries import WINDOW_DTYPE
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+
+
+def run_recorded(simulate, tmp_path, extension):
+    timeseries_file = str(tmp_path / ('windows' + extension))
+    trace_file = str(tmp_path / ('trace' + extension + '.npy'))
+    simulate([FLOW], ['-s', 1, '-t', 100, '-c', 4, '-w', 2,
+                      '--timeseries-file', timeseries_file,
+                      '--timeseries-window', 10.0, '--trace-file', trace_file])
+    return timeseries_file, np.load(trace_file)
+
+
+def test_windows_count_the_traced_completions(simulate, tmp_path):
+    timeseries_file, events = run_recorded(simulate, tmp_path, '.bin')
+    windows = np.fromfile(timeseries_file, dtype=WINDOW_DTYPE)
+
+    # Consecutive windows of the given width, the last one cut short
+    assert windows['start'][0] == 0.0
+    assert np.array_equal(windows['start'][1:], windows['end'][:-1])
+    assert np.allclose(np.diff(windows['start']), 10.0)
+    assert windows['end'][-1] - windows['start'][-1] <= 10.0
+
+    completions = events['time'][events['event'] == trace.COMPLETE]
+    window_of = np.searchsorted(windows['end'], completions)
+    counts = np.bincount(window_of, minlength=len(windows))
+    assert np.array_equal(windows['completed'], counts)
+    assert np.allclose(windows['throughput'], windows['completed'] /
+                       (windows['end'] - windows['start']))
+    assert (windows['active_cores'] <= 8).all()
+
+
+def test_json_lines_match_the_binary_records(simulate, tmp_path):
+    binary = np.fromfile(run_recorded(simulate, tmp_path, '.bin')[0],
+                         dtype=WINDOW_DTYPE)
+    with open(run_recorded(simulate, tmp_path, '.jsonl')[0]) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == len(binary)
+    for line, record in zip(lines, binary):
+        assert list(line) == list(WINDOW_DTYPE.names)
+        assert tuple(line.values()) == tuple(record.tolist())
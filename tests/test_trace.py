@@ -0,0 +1,38 @@
+import numpy as np
+
+from request.request import Request
+from util import trace
+from util.trace import Tracer
+
+FLOW = {'work_gen': 'lognormal_request', 'inter_gen': 'poisson_arrival',
+        'mean': -0.38, 'std_dev_request': 2.36, 'load': 0.8,
+        'time_slice': 0.0, 'preemption': 0.0, 'enq_front': False}
+
+
+def test_ring_buffer_keeps_the_latest_events_in_order():
+    tracer = Tracer(4)
+    for i in range(10):
+        tracer.record(trace.ARRIVE, float(i), Request(i, 1.0, i, 0, 1.0), -1,
+                      -1)
+    events = tracer.events()
+    assert list(events['idx']) == [6, 7, 8, 9]
+    assert list(events['time']) == [6.0, 7.0, 8.0, 9.0]
+
+
+def test_simulation_trace(simulate, tmp_path):
+    filename = str(tmp_path / 'trace.npy')
+    results = simulate([FLOW], ['-s', 1, '-t', 50, '-c', 4, '-w', 2,
+                                '--controller-type', 'leastloaded',
+                                '--trace-file', filename])
+
+    events = np.load(filename)
+    assert (np.diff(events['time']) >= 0).all()
+    arrivals = events[events['event'] == trace.ARRIVE]
+    completions = events[events['event'] == trace.COMPLETE]
+    assert len(arrivals) >= results[0]['total_completed']
+    # Every request completes once, on a worker, after it arrived
+    assert len(np.unique(completions['idx'])) == len(completions)
+    assert (completions['worker'] >= 0).all()
+    arrival_times = dict(zip(arrivals['idx'], arrivals['time']))
+    assert all(arrival_times[idx] <= time for idx, time in
+               zip(completions['idx'], completions['time']))